@@ -0,0 +1,118 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bipartite import BipartiteGraph
+from cache import CachingTransport
+from crawl import Crawler
+from mock_tmdb import SEED_PERSON, start_server
+from tmdb_api import TMDBAPIUtils
+from transport import make_transport
+
+#############################################################################################################################
+#
+# Use:
+# Wall clock of a co-actor crawl against a local stand-in server with simulated latency: the sequential loop main.py
+# used to run versus the asyncio Crawler.  Both must produce the same graph.
+#
+#   python3 benchmarks/bench_crawl.py --depth 3 --latency 0.1 --concurrency 64
+#
+# With --cache the concurrent crawl is repeated through a CachingTransport, once cold and once warm.
+#
+#############################################################################################################################
+
+
+def sequential_crawl(tmdb: TMDBAPIUtils, seed_id: str, seed_name: str, depth: int) -> BipartiteGraph:
+    """
+    The crawl loop of main.py before the Crawler, one API call at a time
+    """
+    credits = BipartiteGraph()
+    movie_credits = tmdb.get_movie_credits_for_person(seed_id, 8.0)
+    credits.add_actor(seed_id, seed_name, str(len(movie_credits)))
+    iteration_actor_ids = [seed_id]
+    for _ in range(depth):
+        new_actor_ids = []
+        for actor_id in iteration_actor_ids:
+            for movie_credit in tmdb.get_movie_credits_for_person(actor_id, 8.0):
+                cast_list = tmdb.get_movie_cast(movie_credit['id'], 3, [int(actor_id)])
+                for cast in cast_list:
+                    cast_id = str(cast['id'])
+                    if not credits.has_actor(cast_id):
+                        cast_total_movies = str(len(tmdb.get_movie_credits_for_person(cast_id, 8.0)))
+                        credits.add_actor(cast_id, cast['name'].replace(',', ''), cast_total_movies)
+                        new_actor_ids.append(cast_id)
+                credits.add_movie(movie_credit['id'], movie_credit['title'], movie_credit['vote_avg'])
+                credits.add_credit(actor_id, movie_credit['id'], expanded=True)
+                credits.add_movie_cast(movie_credit['id'], cast_list)
+        iteration_actor_ids = new_actor_ids
+    return credits
+
+
+def snapshot(credits: BipartiteGraph) -> tuple:
+    graph = credits.project(star=True)
+    return list(graph.nodes), sorted(graph.weighted_edges())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.1, help="simulated server latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--transport", default="http.client")
+    parser.add_argument("--persons", type=int, default=5000, help="actors in the synthetic universe")
+    parser.add_argument("--movies", type=int, default=2000, help="movies in the synthetic universe")
+    parser.add_argument("--skip-sequential", action="store_true", help="only time the concurrent crawl")
+    parser.add_argument("--cache", action="store_true",
+                        help="also time a cold and a warm concurrent crawl through a fresh disk cache")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency, persons=args.persons, movies=args.movies)
+    tmdb = TMDBAPIUtils(api_key='bench')
+    tmdb.base_url = server.url
+    tmdb.transport = make_transport(args.transport, maxsize=args.concurrency)
+
+    start = time.perf_counter()
+    concurrent = Crawler(tmdb, concurrency=args.concurrency).run(SEED_PERSON, 'Meryl Streep', args.depth)
+    concurrent_time = time.perf_counter() - start
+    concurrent_requests = server.requests
+    print("asyncio crawler:  %8.2f s  %6d requests  %d actors, %d credits"
+          % (concurrent_time, concurrent_requests, concurrent.num_actors(), concurrent.num_credits()))
+
+    if not args.skip_sequential:
+        # a fresh TMDBAPIUtils on the same transport, so the sequential loop starts with an empty memo
+        sequential_tmdb = TMDBAPIUtils(api_key='bench')
+        sequential_tmdb.base_url = server.url
+        sequential_tmdb.transport = tmdb.transport
+        start = time.perf_counter()
+        sequential = sequential_crawl(sequential_tmdb, SEED_PERSON, 'Meryl Streep', args.depth)
+        sequential_time = time.perf_counter() - start
+        memo = sequential_tmdb.memo.stats()
+        print("sequential loop:  %8.2f s  %6d requests  %d actors, %d credits  (%d API calls, %d answered by the memo)"
+              % (sequential_time, server.requests - concurrent_requests, sequential.num_actors(),
+                 sequential.num_credits(), memo['hits'] + memo['misses'], memo['hits']))
+        print("speedup: %.1fx, same graph: %s"
+              % (sequential_time / concurrent_time, snapshot(sequential) == snapshot(concurrent)))
+
+    if args.cache:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CachingTransport(tmdb.transport, os.path.join(tmp, 'cache.sqlite'))
+            for run in ("cold cache", "warm cache"):
+                # a fresh TMDBAPIUtils for each run, so every call goes through the cache rather than the memo
+                cached_tmdb = TMDBAPIUtils(api_key='bench')
+                cached_tmdb.base_url = server.url
+                cached_tmdb.transport = cache
+                requests, bodies = server.requests, server.bodies_sent
+                start = time.perf_counter()
+                cached = Crawler(cached_tmdb, concurrency=args.concurrency).run(SEED_PERSON, 'Meryl Streep',
+                                                                                args.depth)
+                print("%-16s  %8.2f s  %6d requests  %6d full bodies  same graph: %s"
+                      % (run + ":", time.perf_counter() - start, server.requests - requests,
+                         server.bodies_sent - bodies, snapshot(cached) == snapshot(concurrent)))
+            cache.close()
+    else:
+        tmdb.close()
+    server.shutdown()
@@ -0,0 +1,69 @@
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_tmdb import SEED_PERSON, start_server
+from tmdb_api import TMDBAPIUtils
+from transport import HTTPClientTransport
+
+#############################################################################################################################
+#
+# Use:
+# Requests per second of TMDBAPIUtils against a local HTTPS stand-in server, opening a new connection for every call
+# (as tmdb_api.py used to do) versus the keep-alive ConnectionPool.
+#
+#   python3 benchmarks/bench_http.py --requests 2000
+#
+#############################################################################################################################
+
+
+def fresh_connections(server, paths: list) -> None:
+    for path in paths:
+        conn = http.client.HTTPSConnection('localhost', server.port, context=server.client_context)
+        conn.request('GET', path)
+        json.loads(conn.getresponse().read().decode('UTF-8'))
+        conn.close()
+
+
+def pooled_connections(server, paths: list, maxsize: int) -> dict:
+    tmdb = TMDBAPIUtils(api_key='bench')
+    tmdb.base_url = server.url
+    # every call must reach the pool, the paths repeat
+    tmdb.memo_size = 0
+    tmdb.transport = HTTPClientTransport(maxsize=maxsize, cafile=server.certfile)
+    for path in paths:
+        tmdb._get_json(path)
+    tmdb.close()
+    return next(iter(tmdb.transport.pools.values())).stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--maxsize", type=int, default=4, help="pool size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(https=True, directory=tmp)
+        paths = ['/3/person/' + SEED_PERSON + '/movie_credits?api_key=bench&language=en-US'] + \
+                ['/3/movie/' + str(1 + i % 2000) + '/credits?api_key=bench&language=en-US'
+                 for i in range(args.requests - 1)]
+
+        start = time.perf_counter()
+        fresh_connections(server, paths)
+        fresh = time.perf_counter() - start
+        print("new connection per call: %8.0f req/s" % (len(paths) / fresh))
+
+        start = time.perf_counter()
+        stats = pooled_connections(server, paths, args.maxsize)
+        pooled = time.perf_counter() - start
+        print("keep-alive pool:         %8.0f req/s  (%d connections, %d resumed TLS sessions, %d reconnects)"
+              % (len(paths) / pooled, stats['connections'], stats['resumed'], stats['reconnects']))
+        print("speedup: %.1fx" % (fresh / pooled))
+        server.shutdown()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph import Graph
+
+#############################################################################################################################
+#
+# Use:
+# Compare per-item ingestion (add_node / add_edge in a loop, as main.py used to do) with the batch APIs
+# (add_nodes / add_edges) on synthetic co-actor data.
+#
+#   python3 benchmarks/bench_ingest.py --sizes 100000 1000000 10000000 --batch 1000
+#
+# Edges are drawn between n / 4 actors so that pairs repeat and exercise weight counting.
+#
+#############################################################################################################################
+
+
+def synthetic_crawl(num_edges: int, seed: int = 0) -> tuple:
+    """
+    Return (nodes, edges) where nodes is a list of (id, name, total_movies) and edges a list of (source, target)
+    """
+    rng = random.Random(seed)
+    num_nodes = max(2, num_edges // 4)
+    nodes = [(str(i), "Actor " + str(i), str(rng.randint(1, 20))) for i in range(num_nodes)]
+    edges = [(str(rng.randrange(num_nodes)), str(rng.randrange(num_nodes))) for _ in range(num_edges)]
+    return nodes, edges
+
+
+def per_item(nodes: list, edges: list) -> Graph:
+    graph = Graph()
+    for id, name, total_movies in nodes:
+        graph.add_node(id, name, total_movies)
+    for source, target in edges:
+        graph.add_edge(source, target)
+    return graph
+
+
+def batched(nodes: list, edges: list, batch: int) -> Graph:
+    graph = Graph()
+    for start in range(0, len(nodes), batch):
+        graph.add_nodes(nodes[start:start + batch])
+    for start in range(0, len(edges), batch):
+        graph.add_edges(edges[start:start + batch])
+    # apply the queued component unions, which the per-item loop pays as it goes
+    graph.num_components()
+    return graph
+
+
+def timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000], help="number of edges to ingest")
+    parser.add_argument("--batch", type=int, default=1000, help="items per add_nodes / add_edges call")
+    args = parser.parse_args()
+
+    print(f"{'edges':>10} {'per-item s':>11} {'batch s':>9} {'speedup':>8}")
+    for size in args.sizes:
+        nodes, edges = synthetic_crawl(size)
+        item_time, a = timed(per_item, nodes, edges)
+        batch_time, b = timed(batched, nodes, edges, args.batch)
+        assert a.total_edges() == b.total_edges() and a.max_degree_nodes() == b.max_degree_nodes()
+        print(f"{size:>10} {item_time:>11.2f} {batch_time:>9.2f} {item_time / batch_time:>7.2f}x")
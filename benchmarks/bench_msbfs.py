@@ -0,0 +1,54 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import centrality
+from graph import Graph
+from traversal import UNREACHABLE, bfs_distances
+
+#############################################################################################################################
+#
+# Use:
+# Compare all-pairs hop statistics computed with one BFS per source against the bit-parallel multi-source BFS
+# behind Graph.closeness() / harmonic_centrality() / distance_histogram().
+#
+#   python3 benchmarks/bench_msbfs.py --nodes 5000 --edges 20000 --width 256
+#
+#############################################################################################################################
+
+
+def per_source_farness(csr) -> list:
+    farness = []
+    for s in range(csr.num_nodes()):
+        farness.append(sum(d for d in bfs_distances(csr, s) if d != UNREACHABLE))
+    return farness
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=5000)
+    parser.add_argument("--edges", type=int, default=20000)
+    parser.add_argument("--width", type=int, default=256, help="sources per bit-parallel batch")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    graph = Graph()
+    graph.add_nodes((str(i), "Actor " + str(i), "1") for i in range(args.nodes))
+    graph.add_edges((str(rng.randrange(args.nodes)), str(rng.randrange(args.nodes))) for _ in range(args.edges))
+    csr = graph.freeze()
+
+    start = time.perf_counter()
+    expected = per_source_farness(csr)
+    per_source = time.perf_counter() - start
+
+    start = time.perf_counter()
+    farness, _, _, _ = centrality.distance_profile(csr, args.width)
+    bit_parallel = time.perf_counter() - start
+
+    assert list(farness) == expected
+    print(f"per-source BFS  {per_source:8.2f} s")
+    print(f"bit-parallel    {bit_parallel:8.2f} s  ({per_source / bit_parallel:.1f}x, width {args.width})")
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_tmdb import SEED_PERSON, start_server
+from transport import TRANSPORTS, make_transport
+
+#############################################################################################################################
+#
+# Use:
+# Replay the same TMDb-shaped workload through every transport backend against a local stand-in server and report
+# throughput and latency percentiles, one request at a time and in concurrent request_many() batches.
+#
+#   python3 benchmarks/bench_transports.py --requests 2000 --batch 32 --maxsize 8 --latency 0.005 --https
+#
+# Backends whose library is not installed are skipped.
+#
+#############################################################################################################################
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def report(name: str, mode: str, seconds: float, responses: list) -> None:
+    latencies = [r.elapsed * 1000 for r in responses]
+    failed = sum(1 for r in responses if r.status != 200)
+    print("%-12s %-10s %9.0f req/s   p50 %7.2f ms   p95 %7.2f ms   p99 %7.2f ms   max %7.2f ms%s"
+          % (name, mode, len(responses) / seconds, percentile(latencies, 0.5), percentile(latencies, 0.95),
+             percentile(latencies, 0.99), max(latencies), "   %d non-200" % failed if failed else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=32, help="requests per request_many() call")
+    parser.add_argument("--maxsize", type=int, default=8, help="connections per host")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated server latency in seconds")
+    parser.add_argument("--https", action="store_true")
+    parser.add_argument("--transports", nargs="+", default=list(TRANSPORTS), choices=list(TRANSPORTS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(https=args.https, latency=args.latency, directory=tmp)
+        workload = [('GET', server.url + '/3/person/' + SEED_PERSON + '/movie_credits?language=en-US', None)] + \
+                   [('GET', server.url + '/3/movie/' + str(1 + i % 2000) + '/credits?language=en-US', None)
+                    for i in range(args.requests - 1)]
+
+        for name in args.transports:
+            try:
+                transport = make_transport(name, maxsize=args.maxsize, cafile=server.certfile)
+            except ImportError as e:
+                print("%-12s skipped (%s)" % (name, e))
+                continue
+
+            start = time.perf_counter()
+            responses = [transport.request(*request) for request in workload]
+            report(name, "sequential", time.perf_counter() - start, responses)
+
+            start = time.perf_counter()
+            responses = []
+            for i in range(0, len(workload), args.batch):
+                responses.extend(transport.request_many(workload[i:i + args.batch]))
+            report(name, "batched", time.perf_counter() - start, responses)
+            transport.close()
+        server.shutdown()
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import random
+import ssl
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#############################################################################################################################
+#
+# Use:
+# Local stand-in for the two TMDb endpoints used by TMDBAPIUtils, for the network benchmarks.  It serves a synthetic,
+# self-consistent movie universe (a movie's cast and the cast members' credits agree) over HTTP/1.1 keep-alive,
+# optionally over TLS with a throwaway self-signed certificate and with a simulated per-request latency.  Responses
+# carry an ETag and a matching If-None-Match is answered with 304 Not Modified.
+#
+#   server = start_server(https=True, latency=0.1)
+#   ... point a client at server.url (server.certfile / server.client_context trust the certificate) ...
+#   server.shutdown()
+#
+#############################################################################################################################
+
+SEED_PERSON = '5064'
+
+
+def make_certificate(directory: str) -> tuple:
+    """
+    Write a self-signed certificate for 'localhost' with the openssl command line tool
+    :return: (certfile, keyfile)
+    """
+    certfile = os.path.join(directory, 'cert.pem')
+    keyfile = os.path.join(directory, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                    '-addext', 'subjectAltName=DNS:localhost', '-keyout', keyfile, '-out', certfile],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return certfile, keyfile
+
+
+def make_universe(persons: int = 5000, movies: int = 2000, cast_size: int = 8, seed: int = 0) -> dict:
+    """
+    Return {request path: JSON body bytes} for every movie credits and person movie credits endpoint
+    """
+    rng = random.Random(seed)
+    person_ids = [str(i) for i in range(1, persons + 1)]
+    if SEED_PERSON not in person_ids:
+        person_ids[0] = SEED_PERSON
+    bodies = {}
+    filmography = {id: [] for id in person_ids}
+    for m in range(1, movies + 1):
+        title = 'Movie ' + str(m)
+        vote = round(rng.uniform(5.0, 9.5), 1)
+        cast = rng.sample(person_ids, cast_size)
+        if m <= 10 and SEED_PERSON not in cast:
+            cast[0] = SEED_PERSON
+        bodies['/3/movie/' + str(m) + '/credits'] = json.dumps({
+            'id': m,
+            'cast': [{'id': int(p), 'name': 'Actor ' + p, 'character': 'Role ' + str(k), 'order': k,
+                      'credit_id': str(m) + '-' + p} for k, p in enumerate(cast)],
+        }).encode('UTF-8')
+        for p in cast:
+            filmography[p].append({'id': m, 'title': title, 'vote_average': vote})
+    for p, credits in filmography.items():
+        bodies['/3/person/' + p + '/movie_credits'] = json.dumps({'id': int(p), 'cast': credits}).encode('UTF-8')
+    return bodies
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        body = server.bodies.get(self.path.split('?', 1)[0])
+        etag = None
+        if body is None:
+            body = b'{"status_code": 34, "status_message": "The resource you requested could not be found."}'
+            self.send_response(404)
+        else:
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+        with server.lock:
+            server.bodies_sent += 1
+        self.send_header('Content-Type', 'application/json;charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # concurrent crawls open many connections at once, the default backlog of 5 drops SYNs and stalls them for a second
+    request_queue_size = 256
+
+
+def start_server(https: bool = False, latency: float = 0.0, directory: str = None, **universe) -> ThreadingHTTPServer:
+    """
+    Start the stand-in server on a free localhost port in a background thread
+    :param https: serve over TLS, directory is needed for the certificate files
+    :param latency: seconds to sleep before answering each request
+    :param directory: where to write the certificate
+    :param universe: keyword arguments for make_universe()
+    :return: the server, with .port, .url (scheme://localhost:port), .requests (requests served so far),
+        .bodies_sent (those answered with a full body), .certfile and .client_context (SSLContext trusting the
+        certificate), both None for plain http
+    """
+    server = _Server(('localhost', 0), _Handler)
+    server.bodies = make_universe(**universe)
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.bodies_sent = 0
+    server.port = server.socket.getsockname()[1]
+    server.url = ('https' if https else 'http') + '://localhost:' + str(server.port)
+    server.certfile = None
+    server.client_context = None
+    if https:
+        certfile, keyfile = make_certificate(directory)
+        server.certfile = certfile
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        # the handshake runs in the handler thread on first read, not in the accept loop
+        server.socket = context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+        server.client_context = ssl.create_default_context(cafile=certfile)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,195 @@
+from array import array
+
+from graph import Graph
+
+#############################################################################################################################
+#
+# Use:
+# The `BipartiteGraph` class stores the crawl as actor -> movie credits, i.e. the sparse incidence matrix B with one
+# row per actor and one column per movie, filled directly from get_movie_cast() results.  The co-actor `Graph` is its
+# one-mode projection B·Bᵀ: the off-diagonal entry for two actors is the number of movies they share, which is the
+# edge weight.  Keeping the credits means the co-actor graph can be rebuilt with different filters (billing order,
+# movie rating, actor subset) without refetching anything, and memory grows with the number of credits rather than
+# with the number of co-star pairs.
+#
+# The full projection links every pair of actors in a movie's recorded cast, co-star to co-star included.  The crawl
+# in main.py only ever linked the actor being expanded to each co-star of that movie; credits recorded with
+# expanded=True mark those actors, and project(star=True) rebuilds exactly that edge set and its weights.
+#
+#############################################################################################################################
+
+
+class BipartiteGraph:
+
+    def __init__(self):
+        # id -> (id, name, total_movies), actor and movie ids are interned to dense indices
+        self._actors = {}
+        self._actor_index = {}
+        self._actor_ids = []
+        # id -> (id, title, vote_avg)
+        self._movies = {}
+        self._movie_index = {}
+        self._movie_ids = []
+        # incidence list, one entry per credit: actor index, movie index, billing order (-1 if unknown) and
+        # whether the crawl expanded the actor through this movie
+        self._credit_actor = array('i')
+        self._credit_movie = array('i')
+        self._credit_order = array('h')
+        self._credit_expanded = array('b')
+        # (actor index, movie index) -> credit position, so a movie fetched twice does not double count
+        self._credit_index = {}
+        # credits grouped by movie (movie offsets, credit positions), built by _by_movie()
+        self._grouped = None
+
+    def _intern_actor(self, id: str) -> int:
+        i = self._actor_index.get(id)
+        if i is None:
+            i = self._actor_index[id] = len(self._actor_ids)
+            self._actor_ids.append(id)
+        return i
+
+    def _intern_movie(self, id: str) -> int:
+        i = self._movie_index.get(id)
+        if i is None:
+            i = self._movie_index[id] = len(self._movie_ids)
+            self._movie_ids.append(id)
+        return i
+
+    def add_actor(self, id: str, name: str, total_movies: str) -> None:
+        """
+        Add an actor, or replace the name / total_movies of an actor first seen through a credit
+        """
+        self._intern_actor(id)
+        self._actors[id] = (id, name, total_movies)
+
+    def add_movie(self, id: str, title: str = None, vote_avg: float = None) -> None:
+        """
+        Add a movie with optional title and vote average, e.g. from get_movie_credits_for_person() results
+        """
+        self._intern_movie(id)
+        self._movies[id] = (id, title, vote_avg)
+
+    def add_credit(self, actor_id: str, movie_id: str, order: int = -1, expanded: bool = False) -> None:
+        """
+        Record that an actor appears in a movie, with their billing order if known
+        A credit that is already recorded only picks up a billing order it was missing and the expanded flag
+        :param expanded: the crawl expanded this actor through this movie, i.e. fetched the movie's cast for them
+        """
+        a, m = self._intern_actor(actor_id), self._intern_movie(movie_id)
+        k = self._credit_index.get((a, m))
+        if k is not None:
+            if order >= 0 and self._credit_order[k] < 0:
+                self._credit_order[k] = order
+            if expanded:
+                self._credit_expanded[k] = 1
+            return
+        self._credit_index[(a, m)] = len(self._credit_actor)
+        self._credit_actor.append(a)
+        self._credit_movie.append(m)
+        self._credit_order.append(order)
+        self._credit_expanded.append(1 if expanded else 0)
+        self._grouped = None
+
+    def add_movie_cast(self, movie_id: str, cast_list: list) -> None:
+        """
+        Record the credits of a get_movie_cast() result.  Cast members that are not known actors yet are added
+        with their name and an empty total_movies, which add_actor() can fill in later.
+        :param movie_id: the movie id
+        :param cast_list: list of dicts with at least 'id', 'name' and 'order' keys
+        """
+        self._intern_movie(movie_id)
+        for cast in cast_list:
+            actor_id = str(cast['id'])
+            if actor_id not in self._actors:
+                self.add_actor(actor_id, cast['name'].replace(',', ''), '')
+            self.add_credit(actor_id, movie_id, cast.get('order', -1))
+
+    def has_actor(self, id: str) -> bool:
+        """
+        Return True if the actor was added with add_actor() or add_movie_cast()
+        """
+        return id in self._actors
+
+    def num_actors(self) -> int:
+        return len(self._actor_ids)
+
+    def num_movies(self) -> int:
+        return len(self._movie_ids)
+
+    def num_credits(self) -> int:
+        return len(self._credit_actor)
+
+    def _by_movie(self) -> tuple:
+        """
+        Return (offsets, credits): the positions of the credits of movie m are credits[offsets[m]:offsets[m + 1]],
+        in the order they were recorded (a counting sort of the incidence list by movie)
+        """
+        if self._grouped is None:
+            num_movies = len(self._movie_ids)
+            offsets = array('q', [0]) * (num_movies + 1)
+            for m in self._credit_movie:
+                offsets[m + 1] += 1
+            for m in range(num_movies):
+                offsets[m + 1] += offsets[m]
+            credits = array('q', [0]) * len(self._credit_movie)
+            cursor = array('q', offsets[:num_movies])
+            for k, m in enumerate(self._credit_movie):
+                credits[cursor[m]] = k
+                cursor[m] += 1
+            self._grouped = (offsets, credits)
+        return self._grouped
+
+    def project(self, max_order: int = None, min_vote: float = None, actors=None, star: bool = False) -> Graph:
+        """
+        Build the co-actor Graph as the projection B·Bᵀ of the (filtered) credits.  The product is formed movie by
+        movie: every pair of kept actors in a movie's cast gains one unit of edge weight, so edge weights are the
+        number of shared movies.  Actors keep their insertion order; filters are applied to the credits, so the
+        same crawl can be projected in several ways without touching the API.
+        With star, only expanded actors are linked, each to every cast member with a known billing order in the
+        movies they were expanded through; a pair gains one unit of weight per expansion that links it.  This is
+        the graph the sequential crawl built with add_edge(actor, co-star).
+        :param max_order: only use credits with a billing order below this value (unknown orders are kept, except
+            for the co-star side of a star projection)
+        :param min_vote: only use movies with a vote average of at least this value (unknown ratings are kept)
+        :param actors: optional iterable of actor ids to restrict the graph to
+        :param star: link expanded actors to their co-stars only, instead of every pair of the cast
+        :return: Graph
+        """
+        keep_actor = None
+        if actors is not None:
+            keep_actor = {self._actor_index[id] for id in actors if id in self._actor_index}
+
+        weights = {}
+        offsets, credits = self._by_movie()
+        for m, movie_id in enumerate(self._movie_ids):
+            if min_vote is not None:
+                vote = self._movies.get(movie_id, (movie_id, None, None))[2]
+                if vote is not None and vote < min_vote:
+                    continue
+            cast = []
+            expanded = []
+            for k in credits[offsets[m]:offsets[m + 1]]:
+                a, order = self._credit_actor[k], self._credit_order[k]
+                if keep_actor is not None and a not in keep_actor:
+                    continue
+                if star and self._credit_expanded[k]:
+                    expanded.append(a)
+                if max_order is not None and order >= max_order:
+                    continue
+                if star and order < 0:
+                    continue
+                cast.append(a)
+            if star:
+                pairs = ((x, y) for x in expanded for y in cast if x != y)
+            else:
+                pairs = ((cast[i], cast[j]) for i in range(len(cast)) for j in range(i + 1, len(cast)))
+            for x, y in pairs:
+                pair = (x, y) if x < y else (y, x)
+                weights[pair] = weights.get(pair, 0) + 1
+
+        graph = Graph()
+        ids = self._actor_ids
+        graph.add_nodes(self._actors.get(id, (id, '', '')) for a, id in enumerate(ids)
+                        if keep_actor is None or a in keep_actor)
+        graph._add_edges_bulk((ids[a], ids[b], w) for (a, b), w in weights.items())
+        return graph
@@ -0,0 +1,193 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from transport import Response, Transport
+
+#############################################################################################################################
+#
+# Use:
+# Persistent response cache for `TMDBAPIUtils`, wrapped around any `Transport`:
+#
+#   tmdb.transport = CachingTransport(make_transport('http.client'), 'tmdb_cache.sqlite')
+#
+# Successful GET responses are kept in a sqlite3 database with zlib compressed bodies, keyed by URL with the query
+# parameters sorted and the api_key left out.  A cached response is served without any request until its endpoint's
+# TTL runs out; after that it is revalidated with If-None-Match and its ETag, and a 304 Not Modified renews it without
+# downloading the body again.  When the compressed bodies outgrow max_bytes the least recently used entries are evicted.
+#
+#############################################################################################################################
+
+DAY = 24 * 60 * 60
+
+# seconds a response stays fresh, by endpoint (path with numeric ids replaced by {id})
+DEFAULT_TTLS = {
+    '/3/person/{id}/movie_credits': 7 * DAY,
+    '/3/movie/{id}/credits': 30 * DAY,
+}
+
+# a numeric path segment following a named one, e.g. the 603 of /3/movie/603/credits but not the API version
+_ID = re.compile(r'(?<=[^/\d])/\d+(?=/|$)')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    etag TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def endpoint(url: str) -> str:
+    """
+    Return the endpoint of a url, its path with numeric ids replaced by {id}
+    e.g. endpoint('https://api.themoviedb.org/3/movie/603/credits?language=en-US') == '/3/movie/{id}/credits'
+    """
+    return _ID.sub('/{id}', urlsplit(url).path)
+
+
+def cache_key(url: str) -> str:
+    """
+    Return the cache key of a url: scheme, host, path and the sorted query parameters without the api_key
+    """
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name != 'api_key')
+    return parts.scheme + '://' + parts.netloc + parts.path + ('?' + urlencode(query) if query else '')
+
+
+class CachingTransport(Transport):
+
+    def __init__(self, transport: Transport, path: str = 'tmdb_cache.sqlite', ttls: dict = None,
+                 default_ttl: float = DAY, max_bytes: int = 256 * 1024 * 1024):
+        """
+        :param transport: Transport that sends the requests the cache cannot answer
+        :param path: sqlite database file, created if missing
+        :param ttls: {endpoint: seconds} freshness per endpoint, DEFAULT_TTLS if not given
+        :param default_ttl: freshness of endpoints missing from ttls
+        :param max_bytes: bound on the total size of the compressed bodies
+        """
+        super().__init__(transport.maxsize, transport.timeout, transport.cafile)
+        self.transport = transport
+        self.path = path
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        # hits: served from the cache, revalidated: 304 from the server, misses: full body downloaded
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self._size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def _ttl(self, url: str) -> float:
+        return self.ttls.get(endpoint(url), self.default_ttl)
+
+    def _lookup(self, method: str, url: str, headers: dict) -> tuple:
+        """
+        Look a request up in the cache
+        :return: (fresh cached Response or None, cached row or None, headers to send upstream)
+        """
+        if method != 'GET':
+            return None, None, headers
+        key = cache_key(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute('SELECT status, headers, etag, body, fetched FROM responses WHERE key = ?',
+                                   (key,)).fetchone()
+            if row is None:
+                return None, None, headers
+            self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            # freshness follows the current TTLs, not the ones in force when the response was stored
+            if now - row[4] < self._ttl(url):
+                self.stats['hits'] += 1
+                return Response(row[0], json.loads(row[1]), zlib.decompress(row[3])), row, headers
+        if row[2]:
+            headers = dict(headers or {}, **{'If-None-Match': row[2]})
+        return None, row, headers
+
+    def _store(self, url: str, response: Response) -> None:
+        key = cache_key(url)
+        body = zlib.compress(response.body)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             (key, response.status, json.dumps(response.headers), response.headers.get('etag'),
+                              body, len(body), now, now))
+            self._size += len(body) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """
+        Delete least recently used entries until the bodies fit in max_bytes, called with the lock held
+        """
+        victims = []
+        for key, size in self._db.execute('SELECT key, size FROM responses ORDER BY accessed'):
+            if self._size <= self.max_bytes:
+                break
+            victims.append((key,))
+            self._size -= size
+        self._db.executemany('DELETE FROM responses WHERE key = ?', victims)
+        self.stats['evictions'] += len(victims)
+
+    def _finish(self, method: str, url: str, row: tuple, response: Response) -> Response:
+        """
+        Turn the upstream response into the answer: renew and serve the cached body on 304, store a new 200
+        """
+        if row is not None and response.status == 304:
+            with self._lock:
+                self._db.execute('UPDATE responses SET fetched = ? WHERE key = ?', (time.time(), cache_key(url)))
+                self.stats['revalidated'] += 1
+            return Response(row[0], json.loads(row[1]), zlib.decompress(row[3]), response.elapsed)
+        self.stats['misses'] += 1
+        if method == 'GET' and response.status == 200:
+            self._store(url, response)
+        return response
+
+    def request(self, method: str, url: str, headers: dict = None) -> Response:
+        cached, row, headers = self._lookup(method, url, headers)
+        if cached is not None:
+            return cached
+        return self._finish(method, url, row, self.transport.request(method, url, headers))
+
+    def request_many(self, requests: list) -> list:
+        results = [None] * len(requests)
+        upstream = []
+        for i, (method, url, headers) in enumerate(requests):
+            cached, row, headers = self._lookup(method, url, headers)
+            if cached is not None:
+                results[i] = cached
+            else:
+                upstream.append((i, row, (method, url, headers)))
+        if upstream:
+            responses = self.transport.request_many([request for _, _, request in upstream])
+            for (i, row, (method, url, _)), response in zip(upstream, responses):
+                results[i] = self._finish(method, url, row, response)
+        return results
+
+    def clear(self) -> None:
+        """
+        Drop every cached response
+        """
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+            self._size = 0
+
+    def close(self) -> None:
+        self.transport.close()
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,264 @@
+import math
+import multiprocessing
+import operator
+import os
+import random
+import tempfile
+from array import array
+
+from csr import CSRGraph
+from traversal import popcount, multi_source_bfs
+
+#############################################################################################################################
+#
+# Use:
+# Centrality measures over a frozen `CSRGraph`.  Scores are kept in array('d') buffers indexed by node index and every
+# iteration is a pass over the CSR rows, with the per-row gathers done by map()/sum() so the inner loop runs in C.
+# `Graph` exposes these as methods returning {id: score} dicts.
+#
+#############################################################################################################################
+
+
+def _start_vector(csr: CSRGraph, initial) -> array:
+    """
+    Return an array('d') of starting scores: uniform, or taken from an {id: score} dict of a previous run
+    Nodes missing from initial start at the mean of the given scores.
+    """
+    n = csr.num_nodes()
+    if not initial:
+        return array('d', [1.0 / n]) * n
+    fill = sum(initial.values()) / len(initial)
+    return array('d', [initial.get(id, fill) for id in csr.ids])
+
+
+def _row_sums(csr: CSRGraph, values, weighted: bool) -> array:
+    """
+    Return sum over the neighbours of every node of values[neighbour] (times the edge weight if weighted)
+    """
+    offsets, neighbors, weights = csr.offsets, csr.neighbors, csr.weights
+    get = values.__getitem__
+    sums = array('d', [0.0]) * csr.num_nodes()
+    for v in range(csr.num_nodes()):
+        start, end = offsets[v], offsets[v + 1]
+        if weighted:
+            sums[v] = sum(map(operator.mul, map(get, neighbors[start:end]), weights[start:end]))
+        else:
+            sums[v] = sum(map(get, neighbors[start:end]))
+    return sums
+
+
+def pagerank(csr: CSRGraph, damping: float = 0.85, weighted: bool = False, tol: float = 1e-6,
+             max_iter: int = 100, initial: dict = None) -> array:
+    """
+    PageRank by power iteration.  Each node splits its rank between its neighbours, evenly or in proportion
+    to the co-star weights; the rank of isolated nodes is spread over the whole graph.
+    Cost: each iteration is a pure Python pass over the edges, about 0.7 s per million edges (1.2 s weighted)
+    on CPython 3.11.  A 10M edge graph therefore takes about 7 s per iteration: a run with the default tol
+    (2-3 iterations on a random graph) takes about 20 s and a tight tol (20-50 iterations) several minutes,
+    well over a 10 s budget.
+    :param csr: CSRGraph
+    :param damping: probability of following an edge rather than jumping to a random node
+    :param weighted: split rank by edge weight instead of evenly
+    :param tol: stop once the L1 change between iterations is below n * tol
+    :param max_iter: maximum number of iterations
+    :param initial: optional {id: score} dict, e.g. the scores of a previous run, to warm start from
+    :return: array('d') of scores summing to 1, indexed by node index
+    """
+    n = csr.num_nodes()
+    if n == 0:
+        return array('d')
+    out = array('d', (csr.weighted_degree(v) if weighted else csr.degree(v) for v in range(n)))
+    rank = _start_vector(csr, initial)
+    total = sum(rank)
+    rank = array('d', (r / total for r in rank))
+
+    for _ in range(max_iter):
+        share = array('d', (r / o if o else 0.0 for r, o in zip(rank, out)))
+        dangling = sum(r for r, o in zip(rank, out) if not o)
+        base = (1.0 - damping) / n + damping * dangling / n
+        sums = _row_sums(csr, share, weighted)
+        new_rank = array('d', (base + damping * s for s in sums))
+        err = sum(map(abs, map(operator.sub, new_rank, rank)))
+        rank = new_rank
+        if err < n * tol:
+            break
+    return rank
+
+
+def eigenvector_centrality(csr: CSRGraph, weighted: bool = False, tol: float = 1e-6, max_iter: int = 100,
+                           initial: dict = None) -> array:
+    """
+    Eigenvector centrality by power iteration on (A + I), which has the same leading eigenvector as the
+    adjacency matrix A but also converges on bipartite-like graphs.
+    :param csr: CSRGraph
+    :param weighted: use the co-star weights as the adjacency values
+    :param tol: stop once the L1 change between iterations is below n * tol
+    :param max_iter: maximum number of iterations
+    :param initial: optional {id: score} dict, e.g. the scores of a previous run, to warm start from
+    :return: array('d') of scores with unit L2 norm, indexed by node index
+    """
+    n = csr.num_nodes()
+    if n == 0:
+        return array('d')
+    x = _start_vector(csr, initial)
+    for _ in range(max_iter):
+        sums = _row_sums(csr, x, weighted)
+        new_x = array('d', map(operator.add, x, sums))
+        norm = math.sqrt(sum(v * v for v in new_x)) or 1.0
+        new_x = array('d', (v / norm for v in new_x))
+        err = sum(map(abs, map(operator.sub, new_x, x)))
+        x = new_x
+        if err < n * tol:
+            break
+    return x
+
+
+def _brandes_accumulate(csr: CSRGraph, sources, squares: bool = False) -> tuple:
+    """
+    Run Brandes' single-source dependency accumulation (unweighted shortest paths) from every source
+    :param csr: CSRGraph
+    :param sources: iterable of source node indices
+    :param squares: also accumulate the squared dependencies, needed for the sampling error estimate
+    :return: (sum of dependencies, sum of squared dependencies or None), both array('d') by node index
+    """
+    n = csr.num_nodes()
+    offsets, neighbors = csr.offsets, csr.neighbors
+    total = array('d', [0.0]) * n
+    total_sq = array('d', [0.0]) * n if squares else None
+    dist = array('i', [-1]) * n
+    sigma = array('d', [0.0]) * n
+    delta = array('d', [0.0]) * n
+    for s in sources:
+        dist[s] = 0
+        sigma[s] = 1.0
+        order = [s]
+        i = 0
+        while i < len(order):
+            u = order[i]
+            i += 1
+            du = dist[u] + 1
+            for v in neighbors[offsets[u]:offsets[u + 1]]:
+                if dist[v] < 0:
+                    dist[v] = du
+                    order.append(v)
+                if dist[v] == du:
+                    sigma[v] += sigma[u]
+        # walk back from the farthest nodes, pushing dependencies onto predecessors (neighbours one hop closer)
+        for w in reversed(order):
+            dw = dist[w] - 1
+            coefficient = (1.0 + delta[w]) / sigma[w]
+            for v in neighbors[offsets[w]:offsets[w + 1]]:
+                if dist[v] == dw:
+                    delta[v] += sigma[v] * coefficient
+            if w != s:
+                total[w] += delta[w]
+                if squares:
+                    total_sq[w] += delta[w] * delta[w]
+        for w in order:
+            dist[w] = -1
+            sigma[w] = 0.0
+            delta[w] = 0.0
+    return total, total_sq
+
+
+# CSRGraph opened by each pool worker from the shared snapshot
+_worker_csr = None
+
+
+def _init_worker(path: str) -> None:
+    global _worker_csr
+    _worker_csr = CSRGraph.open(path)
+
+
+def _worker_accumulate(args: tuple) -> tuple:
+    sources, squares = args
+    return _brandes_accumulate(_worker_csr, sources, squares)
+
+
+def betweenness(csr: CSRGraph, normalized: bool = True, samples: int = None, processes: int = None,
+                seed: int = None) -> tuple:
+    """
+    Betweenness centrality by Brandes' algorithm, exact or estimated from a random sample of pivot sources.
+    Sources are split into chunks that a multiprocessing pool works through in parallel; every worker maps
+    the same binary snapshot of the graph read-only, and the partial dependency vectors are summed at the end.
+    With samples, scores are extrapolated by n / samples and a per-node standard error is estimated from
+    the spread of the sampled dependencies.
+    :param csr: CSRGraph
+    :param normalized: divide by (n - 1)(n - 2), the number of pairs that do not include the node
+    :param samples: number of pivot sources to sample, None for the exact O(VE) computation
+    :param processes: pool size, None for os.cpu_count(), 1 to run in this process
+    :param seed: random seed for the pivot sample
+    :return: (scores, stderr), array('d') by node index; stderr is all zeros in exact mode
+    """
+    n = csr.num_nodes()
+    if samples is None or samples >= n:
+        sources, squares = list(range(n)), False
+    else:
+        sources, squares = random.Random(seed).sample(range(n), samples), True
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1 or len(sources) < 2:
+        total, total_sq = _brandes_accumulate(csr, sources, squares)
+    else:
+        chunks = [(sources[i::processes * 4], squares) for i in range(processes * 4)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = csr.path or os.path.join(tmp, 'graph.bin')
+            if csr.path is None:
+                csr.save(path)
+            with multiprocessing.Pool(processes, _init_worker, (path,)) as pool:
+                total = array('d', [0.0]) * n
+                total_sq = array('d', [0.0]) * n if squares else None
+                for part, part_sq in pool.imap_unordered(_worker_accumulate, chunks):
+                    total = array('d', map(operator.add, total, part))
+                    if squares:
+                        total_sq = array('d', map(operator.add, total_sq, part_sq))
+
+    k = len(sources)
+    # each undirected pair is seen from both ends, and a sample stands for n / k sources
+    scale = (1.0 / ((n - 1) * (n - 2)) if n > 2 else 1.0) if normalized else 0.5
+    scale *= n / k if k else 0.0
+    scores = array('d', (t * scale for t in total))
+    stderr = array('d', [0.0]) * n
+    if squares and k > 1:
+        for v in range(n):
+            mean = total[v] / k
+            variance = max(total_sq[v] / k - mean * mean, 0.0) * k / (k - 1)
+            stderr[v] = math.sqrt(variance / k) * k * scale
+    return scores, stderr
+
+
+def distance_profile(csr: CSRGraph, width: int = 256) -> tuple:
+    """
+    All-pairs hop statistics from one bit-parallel multi-source BFS over every node.  The graph is undirected,
+    so the number of sources reaching node v at depth d is also the number of nodes v reaches at depth d.
+    :param csr: CSRGraph
+    :param width: sources advanced together per BFS batch
+    :return: (farness, reach, harmonic, histogram) where the first three are array('d') by node index holding the
+        sum of distances to, the number of, and the sum of 1 / distance over the reachable nodes, and histogram is
+        a dict of distance -> number of unordered node pairs at that distance
+    """
+    n = csr.num_nodes()
+    farness = array('d', [0.0]) * n
+    reach = array('d', [0.0]) * n
+    harmonic = array('d', [0.0]) * n
+    histogram = {}
+    for _, depth, reached in multi_source_bfs(csr, list(range(n)), width):
+        inverse = 1.0 / depth
+        level = 0
+        for v, bits in reached.items():
+            count = popcount(bits)
+            farness[v] += depth * count
+            reach[v] += count
+            harmonic[v] += count * inverse
+            level += count
+        histogram[depth] = histogram.get(depth, 0) + level
+    return farness, reach, harmonic, {d: c // 2 for d, c in sorted(histogram.items())}
+
+
+def closeness(csr: CSRGraph, farness, reach) -> array:
+    """
+    Closeness centrality from distance_profile() output, scaled by the fraction of the graph each node reaches
+    so that nodes in small components are not ranked above well connected ones (Wasserman and Faust)
+    """
+    n = csr.num_nodes()
+    return array('d', ((r / f) * (r / (n - 1)) if f and n > 1 else 0.0 for f, r in zip(farness, reach)))
@@ -0,0 +1,211 @@
+import random
+from array import array
+
+from csr import CSRGraph
+
+#############################################################################################################################
+#
+# Use:
+# Community detection over a frozen `CSRGraph`, used to colour and partition the co-actor network.
+#
+# louvain()            weighted Louvain: nodes repeatedly move to the neighbouring community with the best modularity
+#                      gain (computed incrementally from community weight totals), then communities are collapsed
+#                      into single nodes and the process repeats on the smaller graph.
+# label_propagation()  asynchronous label propagation: every node adopts the label carrying the most edge weight among
+#                      its neighbours.  Near-linear and much faster, at the cost of noisier communities.
+#
+# Every level of the Louvain hierarchy is kept in CSR form: offsets / neighbors / float weights arrays with self loops
+# held separately, since aggregated weights outgrow the uint16 weights of `CSRGraph`.
+#
+#############################################################################################################################
+
+
+class _Level:
+    """
+    Weighted undirected graph for one Louvain level
+    """
+
+    def __init__(self, offsets, neighbors, weights, loops):
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        # self loop weight per node, counted twice in the node's degree
+        self.loops = loops
+        self.n = len(loops)
+        self.degree = array('d', (sum(weights[offsets[i]:offsets[i + 1]]) + 2 * loops[i] for i in range(self.n)))
+
+    @classmethod
+    def from_csr(cls, csr: CSRGraph) -> "_Level":
+        n = csr.num_nodes()
+        offsets = array('q', [0]) * (n + 1)
+        neighbors = array('i')
+        weights = array('d')
+        loops = array('d', [0.0]) * n
+        for i in range(n):
+            for k in range(csr.offsets[i], csr.offsets[i + 1]):
+                j = csr.neighbors[k]
+                if j == i:
+                    loops[i] += csr.weights[k]
+                else:
+                    neighbors.append(j)
+                    weights.append(csr.weights[k])
+            offsets[i + 1] = len(neighbors)
+        return cls(offsets, neighbors, weights, loops)
+
+    def aggregate(self, membership, count: int) -> "_Level":
+        """
+        Collapse every community of membership (ids 0..count-1) into one node
+        """
+        rows = [{} for _ in range(count)]
+        loops = array('d', [0.0]) * count
+        for i in range(self.n):
+            ci = membership[i]
+            loops[ci] += self.loops[i]
+            row = rows[ci]
+            for k in range(self.offsets[i], self.offsets[i + 1]):
+                cj = membership[self.neighbors[k]]
+                if cj == ci:
+                    # internal edges are seen from both ends
+                    loops[ci] += self.weights[k] / 2
+                else:
+                    row[cj] = row.get(cj, 0.0) + self.weights[k]
+        offsets = array('q', [0]) * (count + 1)
+        neighbors = array('i')
+        weights = array('d')
+        for c, row in enumerate(rows):
+            for cj in sorted(row):
+                neighbors.append(cj)
+                weights.append(row[cj])
+            offsets[c + 1] = len(neighbors)
+        return _Level(offsets, neighbors, weights, loops)
+
+
+def _renumber(labels) -> tuple:
+    """
+    Map arbitrary labels to 0..count-1, largest community first (ties by first appearance)
+    :return: (array('i') of new labels, count)
+    """
+    sizes = {}
+    for label in labels:
+        sizes[label] = sizes.get(label, 0) + 1
+    order = sorted(sizes, key=lambda label: -sizes[label])
+    new_id = {label: k for k, label in enumerate(order)}
+    return array('i', (new_id[label] for label in labels)), len(order)
+
+
+def _move_nodes(level: _Level, resolution: float, rng) -> tuple:
+    """
+    Louvain local moving phase: sweep the nodes in random order, moving each to the neighbouring community with
+    the largest modularity gain, until a sweep moves nothing
+    :return: (membership array('i'), True if any node moved)
+    """
+    n = level.n
+    m2 = sum(level.degree)
+    membership = array('i', range(n))
+    total = array('d', level.degree)
+    order = list(range(n))
+    improved = False
+    moved = True
+    while moved:
+        moved = False
+        rng.shuffle(order)
+        for i in order:
+            ci = membership[i]
+            ki = level.degree[i]
+            links = {}
+            for k in range(level.offsets[i], level.offsets[i + 1]):
+                c = membership[level.neighbors[k]]
+                links[c] = links.get(c, 0.0) + level.weights[k]
+            # gain of joining c is links[c] - resolution * total[c] * ki / m2, once i has left its community
+            total[ci] -= ki
+            best = ci
+            best_gain = links.get(ci, 0.0) - resolution * total[ci] * ki / m2
+            for c, w in links.items():
+                gain = w - resolution * total[c] * ki / m2
+                if gain > best_gain + 1e-12:
+                    best, best_gain = c, gain
+            total[best] += ki
+            if best != ci:
+                membership[i] = best
+                moved = improved = True
+    return membership, improved
+
+
+def louvain(csr: CSRGraph, resolution: float = 1.0, seed: int = None) -> array:
+    """
+    Weighted Louvain community detection
+    :param csr: CSRGraph
+    :param resolution: values above 1 favour smaller communities, below 1 larger ones
+    :param seed: random seed for the node visiting order
+    :return: array('i') of community ids by node index, 0 being the largest community
+    """
+    rng = random.Random(seed)
+    level = _Level.from_csr(csr)
+    membership = array('i', range(csr.num_nodes()))
+    if sum(level.degree) == 0:
+        return _renumber(membership)[0]
+    while True:
+        level_membership, improved = _move_nodes(level, resolution, rng)
+        if not improved:
+            break
+        level_membership, count = _renumber(level_membership)
+        membership = array('i', (level_membership[c] for c in membership))
+        level = level.aggregate(level_membership, count)
+    return _renumber(membership)[0]
+
+
+def label_propagation(csr: CSRGraph, max_iter: int = 100, seed: int = None) -> array:
+    """
+    Asynchronous weighted label propagation.  Nodes are visited in a new random order every sweep and take the
+    label with the largest total edge weight among their neighbours, keeping their own label on ties.
+    :param csr: CSRGraph
+    :param max_iter: maximum number of sweeps
+    :param seed: random seed for the visiting order and tie breaking
+    :return: array('i') of community ids by node index, 0 being the largest community
+    """
+    rng = random.Random(seed)
+    n = csr.num_nodes()
+    offsets, neighbors, weights = csr.offsets, csr.neighbors, csr.weights
+    labels = array('i', range(n))
+    order = list(range(n))
+    for _ in range(max_iter):
+        rng.shuffle(order)
+        changed = 0
+        for i in order:
+            start, end = offsets[i], offsets[i + 1]
+            if start == end:
+                continue
+            score = {}
+            for k in range(start, end):
+                label = labels[neighbors[k]]
+                score[label] = score.get(label, 0) + weights[k]
+            best = max(score.values())
+            if score.get(labels[i]) == best:
+                continue
+            labels[i] = rng.choice([label for label, s in score.items() if s == best])
+            changed += 1
+        if not changed:
+            break
+    return _renumber(labels)[0]
+
+
+def modularity(csr: CSRGraph, membership, resolution: float = 1.0) -> float:
+    """
+    Weighted modularity of a partition given as community ids by node index
+    """
+    m2 = 0.0
+    internal = {}
+    total = {}
+    for i in range(csr.num_nodes()):
+        ci = membership[i]
+        for k in range(csr.offsets[i], csr.offsets[i + 1]):
+            j, w = csr.neighbors[k], csr.weights[k]
+            # a self loop is stored once but counts twice, like in the degree
+            w = 2 * w if j == i else w
+            m2 += w
+            total[ci] = total.get(ci, 0.0) + w
+            if membership[j] == ci:
+                internal[ci] = internal.get(ci, 0.0) + w
+    if not m2:
+        return 0.0
+    return sum(internal.get(c, 0.0) / m2 - resolution * (t / m2) ** 2 for c, t in total.items())
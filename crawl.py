@@ -0,0 +1,128 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from bipartite import BipartiteGraph
+from tmdb_api import TMDBAPIUtils
+
+#############################################################################################################################
+#
+# Use:
+# asyncio crawl of the co-actor network.  Each BFS level is expanded in three concurrent rounds, with at most
+# `concurrency` API calls in flight at a time:
+#
+#   1. the movie credits of every actor in the frontier
+#   2. the cast of every movie those credits reference (each movie once, whichever actors share it)
+#   3. the movie credits of every cast member not seen before, for their total_movies
+#
+# The results are then recorded into a `BipartiteGraph` by walking the frontier in the same order as the sequential
+# loop main.py used to run, so nodes, credits and the output files come out identical however the requests interleave.
+# TMDBAPIUtils is synchronous; its calls run on a thread pool of the same size as the concurrency limit, so the
+# transport should allow that many connections per host.
+#
+#############################################################################################################################
+
+
+class Crawler:
+
+    def __init__(self, tmdb: TMDBAPIUtils, concurrency: int = 32, vote_avg_threshold: float = 8.0,
+                 cast_limit: int = 3, verbose: bool = False):
+        """
+        :param tmdb: TMDBAPIUtils to fetch with
+        :param concurrency: maximum number of API calls in flight
+        :param vote_avg_threshold: only follow movie credits with at least this vote average
+        :param cast_limit: only follow cast members with a billing 'order' below this value
+        :param verbose: print the size of every level
+        """
+        self.tmdb = tmdb
+        self.concurrency = concurrency
+        self.vote_avg_threshold = vote_avg_threshold
+        self.cast_limit = cast_limit
+        self.verbose = verbose
+        # thread pool the blocking TMDBAPIUtils calls run on, for the duration of a crawl
+        self._executor = None
+
+    async def _fetch_all(self, fn, keys: list) -> dict:
+        """
+        Call fn(key) for every key concurrently, at most self.concurrency at a time
+        :return: {key: result}
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(key):
+            async with semaphore:
+                return await loop.run_in_executor(self._executor, fn, key)
+
+        results = await asyncio.gather(*(fetch(key) for key in keys))
+        return dict(zip(keys, results))
+
+    def _person_credits(self, person_id: str) -> list:
+        return self.tmdb.get_movie_credits_for_person(person_id, self.vote_avg_threshold)
+
+    def _movie_cast(self, movie_id: str) -> list:
+        return self.tmdb.get_movie_cast(movie_id, self.cast_limit)
+
+    async def crawl(self, seed_id: str, seed_name: str, depth: int = 2) -> BipartiteGraph:
+        """
+        Crawl depth BFS levels out from a seed actor
+        :param seed_id: person id of the seed actor
+        :param seed_name: name of the seed actor
+        :param depth: number of levels to expand
+        :return: BipartiteGraph of the actors and credits found
+        """
+        credits = BipartiteGraph()
+        self._executor = ThreadPoolExecutor(self.concurrency)
+        try:
+            # person id -> filtered movie credits, fetched once per actor for both total_movies and expansion
+            person_credits = await self._fetch_all(self._person_credits, [seed_id])
+            credits.add_actor(seed_id, seed_name, str(len(person_credits[seed_id])))
+            movie_casts = {}
+            frontier = [seed_id]
+            for level in range(depth):
+                if self.verbose:
+                    print("Iteration " + str(level))
+                    print("Iteration Node Size: " + str(len(frontier)))
+
+                missing = [id for id in frontier if id not in person_credits]
+                person_credits.update(await self._fetch_all(self._person_credits, missing))
+                movies = {}
+                for actor_id in frontier:
+                    for movie_credit in person_credits[actor_id]:
+                        if movie_credit['id'] not in movie_casts:
+                            movies[movie_credit['id']] = None
+                movie_casts.update(await self._fetch_all(self._movie_cast, list(movies)))
+
+                # cast members seen for the first time at this level, in sequential crawl order
+                new_actor_ids = []
+                seen = set()
+                for actor_id in frontier:
+                    for movie_credit in person_credits[actor_id]:
+                        for cast in movie_casts[movie_credit['id']]:
+                            cast_id = str(cast['id'])
+                            if cast_id != actor_id and not credits.has_actor(cast_id) and cast_id not in seen:
+                                seen.add(cast_id)
+                                new_actor_ids.append(cast_id)
+                person_credits.update(await self._fetch_all(self._person_credits, new_actor_ids))
+
+                for actor_id in frontier:
+                    for movie_credit in person_credits[actor_id]:
+                        movie_id = movie_credit['id']
+                        cast_list = [cast for cast in movie_casts[movie_id] if str(cast['id']) != actor_id]
+                        for cast in cast_list:
+                            cast_id = str(cast['id'])
+                            if not credits.has_actor(cast_id):
+                                credits.add_actor(cast_id, cast['name'].replace(',', ''),
+                                                  str(len(person_credits[cast_id])))
+                        credits.add_movie(movie_id, movie_credit['title'], movie_credit['vote_avg'])
+                        credits.add_credit(actor_id, movie_id, expanded=True)
+                        credits.add_movie_cast(movie_id, cast_list)
+                frontier = new_actor_ids
+        finally:
+            self._executor.shutdown()
+        return credits
+
+    def run(self, seed_id: str, seed_name: str, depth: int = 2) -> BipartiteGraph:
+        """
+        Run crawl() in a new event loop
+        """
+        return asyncio.run(self.crawl(seed_id, seed_name, depth))
@@ -0,0 +1,279 @@
+import mmap
+import struct
+import sys
+from array import array
+
+#############################################################################################################################
+#
+# Use:
+# The `CSRGraph` class is a frozen, read-only view of a `Graph` used by the analytics methods.  TMDb ids are interned
+# to dense integer indices (0..n-1) and the undirected adjacency is stored in compressed sparse row form:
+#
+#   offsets   array('q')  length n + 1, the neighbours of node i are neighbors[offsets[i]:offsets[i + 1]]
+#   neighbors array('i')  int32 node indices, sorted ascending within each row
+#   weights   array('H')  uint16 co-star counts, parallel to neighbors
+#
+# Every undirected edge is stored in both rows.  A 10M edge graph needs 20M neighbour entries, i.e. 80 MB for
+# neighbors and 40 MB for weights, which is a fraction of the cost of the tuple-of-strings representation.
+#
+# CSRGraph.save() writes the arrays plus string pools for ids, names and movie counts to a binary snapshot that
+# CSRGraph.open() maps back with mmap.  The opened graph reads straight from the page cache through memoryviews,
+# so opening costs O(1) regardless of graph size and every process opening the file shares the same pages.
+#
+#############################################################################################################################
+
+# weights are stored as uint16, counts above this are clamped
+MAX_WEIGHT = 65535
+
+# snapshot layout: header, then a table of (offset, nbytes) for each section, sections 8-byte aligned
+SNAPSHOT_MAGIC = b'CSRG'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SECTIONS = ('offsets', 'neighbors', 'weights', 'id_offsets', 'id_data',
+                     'name_offsets', 'name_data', 'movie_offsets', 'movie_data')
+_HEADER = struct.Struct('=4sBB2xQQ')
+_SECTION = struct.Struct('=QQ')
+
+
+class _StringPool:
+    """
+    Read-only sequence of strings stored as one utf-8 blob plus an int64 offsets array, decoded on access
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string pool index out of range")
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @staticmethod
+    def encode(strings) -> tuple:
+        """
+        Return (offsets array('q'), utf-8 bytes) for a sequence of strings
+        """
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = array('q', [0]) * (len(encoded) + 1)
+        for i, b in enumerate(encoded):
+            offsets[i + 1] = offsets[i] + len(b)
+        return offsets, b''.join(encoded)
+
+
+class CSRGraph:
+
+    def __init__(self, ids: list, offsets, neighbors, weights, names=None, movies=None):
+        """
+        Wrap already built CSR buffers, use CSRGraph.from_edges() to build them from an edge list
+        :param ids: list of TMDb id strings, ids[i] is the id of node index i
+        :param offsets: array('q') of length len(ids) + 1
+        :param neighbors: array('i') of neighbour indices
+        :param weights: array('H') of edge weights parallel to neighbors
+        :param names: optional list of actor names parallel to ids
+        :param movies: optional list of total_movies strings parallel to ids
+        """
+        self.ids = ids
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        self.names = names
+        self.movies = movies
+        self._index = None
+        self._num_edges = None
+        # the mmap backing the buffers of an opened snapshot, and the path it was opened from
+        self._mmap = None
+        self.path = None
+
+    @property
+    def index(self) -> dict:
+        """
+        Dict of TMDb id -> node index, built on first use
+        """
+        if self._index is None:
+            self._index = {id: i for i, id in enumerate(self.ids)}
+        return self._index
+
+    @classmethod
+    def from_edges(cls, ids: list, edges, names=None, movies=None) -> "CSRGraph":
+        """
+        Build the CSR arrays from undirected (i, j, weight) triples over node indices.
+        edges is read twice, once to count degrees and once to fill the rows, and never copied, so apart from the
+        result only O(n) counters are allocated.  Rows come out sorted without a sort: walking the rows in ascending
+        order, every edge is copied from the row of its smaller endpoint into the row of the larger one, then back.
+        :param ids: list of TMDb id strings, ids[i] is the id of node index i
+        :param edges: re-iterable of (i, j, weight) tuples, each undirected pair listed once
+        :param names: optional list of actor names parallel to ids
+        :param movies: optional list of total_movies strings parallel to ids
+        :return: CSRGraph
+        """
+        n = len(ids)
+        offsets = array('q', [0]) * (n + 1)
+        for i, j, _ in edges:
+            offsets[i + 1] += 1
+            if i != j:
+                offsets[j + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        # row i ends up as [neighbours below i | i itself for a self loop | neighbours above i]
+        neighbors = array('i', [0]) * offsets[n]
+        weights = array('H', [0]) * offsets[n]
+        # 1. put the larger endpoint of every pair at the end of its smaller endpoint's row, unsorted;
+        # upper[i] ends at the first neighbour above i
+        upper = array('q', offsets[1:])
+        loops = {}
+        for i, j, w in edges:
+            if w > MAX_WEIGHT:
+                w = MAX_WEIGHT
+            if i == j:
+                loops[i] = w
+                continue
+            if i > j:
+                i, j = j, i
+            k = upper[i] - 1
+            neighbors[k] = j
+            weights[k] = w
+            upper[i] = k
+        # 2. walking rows in ascending order, copy each upper entry (i, j) into the front of row j: every row
+        # receives its neighbours below it in ascending order
+        lower = array('q', offsets[:n])
+        for i in range(n):
+            a, b = upper[i], offsets[i + 1]
+            if a < b:
+                for j, w in zip(neighbors[a:b], weights[a:b]):
+                    c = lower[j]
+                    neighbors[c] = i
+                    weights[c] = w
+                    lower[j] = c + 1
+        for i, w in loops.items():
+            neighbors[lower[i]] = i
+            weights[lower[i]] = w
+        # 3. walking rows in ascending order again, copy each lower entry (j, i) back into row i, overwriting
+        # the unsorted upper parts with sorted ones
+        for j in range(n):
+            a, b = offsets[j], lower[j]
+            if a < b:
+                for i, w in zip(neighbors[a:b], weights[a:b]):
+                    c = upper[i]
+                    neighbors[c] = j
+                    weights[c] = w
+                    upper[i] = c + 1
+        return cls(ids, offsets, neighbors, weights, names, movies)
+
+    def num_nodes(self) -> int:
+        """
+        Returns the number of nodes
+        """
+        return len(self.ids)
+
+    def num_edges(self) -> int:
+        """
+        Returns the number of undirected edges, a self loop counts once
+        """
+        if self._num_edges is None:
+            loops = sum(1 for i in range(len(self.ids)) if i in self.neighbors_of(i))
+            self._num_edges = (len(self.neighbors) + loops) // 2
+        return self._num_edges
+
+    def degree(self, i: int) -> int:
+        """
+        Returns the number of distinct neighbours of node index i
+        """
+        return self.offsets[i + 1] - self.offsets[i]
+
+    def weighted_degree(self, i: int) -> int:
+        """
+        Returns the sum of the edge weights of node index i
+        """
+        return sum(self.weights[self.offsets[i]:self.offsets[i + 1]])
+
+    def neighbors_of(self, i: int):
+        """
+        Returns the neighbour indices of node index i
+        """
+        return self.neighbors[self.offsets[i]:self.offsets[i + 1]]
+
+    def weights_of(self, i: int):
+        """
+        Returns the edge weights of node index i, parallel to neighbors_of(i)
+        """
+        return self.weights[self.offsets[i]:self.offsets[i + 1]]
+
+    def nbytes(self) -> int:
+        """
+        Returns the number of bytes held by the offsets, neighbors and weights buffers
+        """
+        return sum(len(a) * a.itemsize for a in (self.offsets, self.neighbors, self.weights))
+
+    def save(self, path: str) -> None:
+        """
+        Write the graph to a binary snapshot that CSRGraph.open() can memory map
+        :param path: string - path to the snapshot file
+        :return: None
+        """
+        n = len(self.ids)
+        names = self.names if self.names is not None else [''] * n
+        movies = self.movies if self.movies is not None else [''] * n
+        id_offsets, id_data = _StringPool.encode(self.ids)
+        name_offsets, name_data = _StringPool.encode(names)
+        movie_offsets, movie_data = _StringPool.encode(movies)
+        sections = [memoryview(a).cast('B')
+                    for a in (self.offsets, self.neighbors, self.weights, id_offsets, id_data,
+                              name_offsets, name_data, movie_offsets, movie_data)]
+
+        table = []
+        position = _HEADER.size + _SECTION.size * len(sections)
+        for data in sections:
+            position += -position % 8
+            table.append((position, data.nbytes))
+            position += data.nbytes
+
+        with open(path, 'wb') as f:
+            byteorder = 0 if sys.byteorder == 'little' else 1
+            f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, byteorder, n, len(self.neighbors)))
+            for entry in table:
+                f.write(_SECTION.pack(*entry))
+            for (start, _), data in zip(table, sections):
+                f.write(b'\0' * (start - f.tell()))
+                f.write(data)
+
+    @classmethod
+    def open(cls, path: str) -> "CSRGraph":
+        """
+        Memory map a snapshot written by save().  The arrays are zero-copy memoryviews over the mapping,
+        ids / names / movies are decoded lazily, so opening does not read the file.
+        :param path: string - path to the snapshot file
+        :return: CSRGraph
+        """
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byteorder, n, nnz = _HEADER.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} graph snapshot")
+        if byteorder != (0 if sys.byteorder == 'little' else 1):
+            raise ValueError(f"{path} was written on a machine with a different byte order")
+
+        view = memoryview(mm)
+        sections = {}
+        for k, name in enumerate(SNAPSHOT_SECTIONS):
+            start, nbytes = _SECTION.unpack_from(mm, _HEADER.size + k * _SECTION.size)
+            sections[name] = view[start:start + nbytes]
+
+        graph = cls(_StringPool(sections['id_offsets'].cast('q'), sections['id_data']),
+                    sections['offsets'].cast('q'),
+                    sections['neighbors'].cast('i'),
+                    sections['weights'].cast('H'),
+                    _StringPool(sections['name_offsets'].cast('q'), sections['name_data']),
+                    _StringPool(sections['movie_offsets'].cast('q'), sections['movie_data']))
+        graph._mmap = mm
+        graph.path = path
+        return graph
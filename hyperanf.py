@@ -0,0 +1,149 @@
+import math
+
+from csr import CSRGraph
+
+#############################################################################################################################
+#
+# Use:
+# HyperANF approximation of the neighbourhood function N(t), the number of (ordered) node pairs at most t hops apart,
+# over a frozen `CSRGraph`.  Every node keeps a HyperLogLog counter of the nodes within t hops; one iteration sets
+# each counter to the register-wise maximum (the HyperLogLog union) of its own and its neighbours' counters.
+#
+# The m one-byte registers of a counter are packed into a single Python int, one register per byte with the top bit
+# of every byte kept clear as a guard.  The register-wise maximum of two counters is then a handful of whole-int
+# "broadword" operations instead of a loop over m registers, and a counter is decoded with int.to_bytes().
+#
+# Memory is one counter (m bytes) per node and each iteration is a single pass over the edge list.  The relative
+# standard error of every N(t) is at most 1.04 / sqrt(m).
+#
+#############################################################################################################################
+
+# 64 bit hashes leave at most 64 - log2m + 1 <= 61 in a register, which fits under the per-byte guard bit
+HASH_BITS = 64
+_MASK64 = (1 << 64) - 1
+_INVERSE_POWERS = [2.0 ** -k for k in range(HASH_BITS + 1)]
+
+
+def _splitmix64(x: int) -> int:
+    """
+    Return a well mixed 64 bit hash of the integer x
+    """
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _alpha(m: int) -> float:
+    """
+    HyperLogLog bias correction constant for m registers
+    """
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1.0 + 1.079 / m)
+
+
+def _estimate(counter: int, m: int) -> float:
+    """
+    Return the HyperLogLog cardinality estimate of a packed counter, with the linear counting correction
+    for small cardinalities
+    """
+    registers = counter.to_bytes(m, 'little')
+    estimate = _alpha(m) * m * m / sum(map(_INVERSE_POWERS.__getitem__, registers))
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+        return m * math.log(m / zeros)
+    return estimate
+
+
+def neighbourhood_function(csr: CSRGraph, log2m: int = 7, max_iter: int = 256, seed: int = 0) -> list:
+    """
+    Estimate N(t) for t = 0, 1, ... until no counter changes (the graph's diameter has been covered)
+    :param csr: CSRGraph
+    :param log2m: log2 of the number of registers per counter, from 4 to 16; more registers, less error
+    :param max_iter: maximum number of iterations
+    :param seed: hash seed, different seeds give independent estimates
+    :return: list of float, N(t) at index t
+    """
+    if not 4 <= log2m <= 16:
+        raise ValueError("log2m must be between 4 and 16")
+    n = csr.num_nodes()
+    m = 1 << log2m
+    offsets, neighbors = csr.offsets, csr.neighbors
+    # guard bit of every register, and all register bits below the guards
+    guards = int.from_bytes(b'\x80' * m, 'little')
+    values = int.from_bytes(b'\x7f' * m, 'little')
+
+    counters = []
+    for v in range(n):
+        h = _splitmix64(v ^ (seed * 0x9E3779B97F4A7C15))
+        register = h & (m - 1)
+        rest = h >> log2m
+        rank = (HASH_BITS - log2m) - rest.bit_length() + 1
+        counters.append(rank << (8 * register))
+    estimates = [_estimate(c, m) for c in counters]
+    result = [float(n)]
+
+    for _ in range(max_iter):
+        new_counters = list(counters)
+        changed = 0
+        for v in range(n):
+            x = counters[v]
+            for u in neighbors[offsets[v]:offsets[v + 1]]:
+                y = counters[u]
+                if y == x:
+                    continue
+                # guard bit survives in the registers where x >= y, widen it to a full register mask
+                ge = ((x | guards) - y) & guards
+                mask = (ge << 1) - (ge >> 7)
+                x = (x & mask) | (y & ~mask & values)
+            if x != counters[v]:
+                new_counters[v] = x
+                estimates[v] = _estimate(x, m)
+                changed += 1
+        counters = new_counters
+        if not changed:
+            break
+        result.append(sum(estimates))
+    return result
+
+
+def distance_statistics(neighbourhood: list, log2m: int = 7) -> dict:
+    """
+    Summarise a neighbourhood function
+    :param neighbourhood: N(t) as returned by neighbourhood_function()
+    :param log2m: registers per counter used to compute it, for the error bound
+    :return: dict with
+        'neighbourhood_function': N(t) by t
+        'average_neighbourhood': N(t) / n, the mean number of actors within t hops (including the actor)
+        'distance_distribution': number of ordered pairs at exactly t hops, t >= 1
+        'average_distance': mean hops over connected pairs of distinct nodes
+        'effective_diameter': interpolated hops within which 90% of the connected pairs lie
+        'relative_std_error': bound on the relative standard error of each N(t)
+    """
+    n = neighbourhood[0]
+    distribution = [max(b - a, 0.0) for a, b in zip(neighbourhood, neighbourhood[1:])]
+    connected = sum(distribution)
+    average = sum(t * d for t, d in enumerate(distribution, 1)) / connected if connected else 0.0
+
+    effective = 0.0
+    if connected:
+        target = n + 0.9 * connected
+        for t in range(1, len(neighbourhood)):
+            if neighbourhood[t] >= target:
+                step = neighbourhood[t] - neighbourhood[t - 1]
+                effective = t - 1 + ((target - neighbourhood[t - 1]) / step if step else 1.0)
+                break
+
+    return {
+        'neighbourhood_function': list(neighbourhood),
+        'average_neighbourhood': [v / n for v in neighbourhood] if n else [],
+        'distance_distribution': distribution,
+        'average_distance': average,
+        'effective_diameter': effective,
+        'relative_std_error': 1.04 / math.sqrt(1 << log2m),
+    }
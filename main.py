@@ -4,8 +4,10 @@ import csv
 import os
 from dotenv import load_dotenv
 from collections import defaultdict
-from graph import Graph
+from cache import CachingTransport
+from crawl import Crawler
 from tmdb_api import TMDBAPIUtils
+from transport import make_transport
 
 
 
@@ -64,50 +66,37 @@ from tmdb_api import TMDBAPIUtils
 #   can occasionally result in timeout errors. It may be necessary to insert periodic sleeps when you are building your graph.
 
 if __name__ == "__main__":
-    #Create an instance of the Graph class
-    graph = Graph()
-
     # Load environment variables from the .env file in the root directory
     load_dotenv()
 
     # Access the API key
     api_key = os.getenv("API_KEY")
 
+    # Maximum number of API calls in flight
+    concurrency = int(os.getenv("CONCURRENCY", "32"))
+
     # Create an instance of the TMDBAPIUtils class using the api key
     tmdb_api_utils = TMDBAPIUtils(api_key = api_key)
+    # HTTP backend: http.client (default), urllib3 or pycurl
+    tmdb_api_utils.transport = make_transport(os.getenv("TRANSPORT", "http.client"), maxsize = concurrency)
+    # Keep responses on disk between runs, set CACHE to an empty string to always fetch
+    cache_path = os.getenv("CACHE", "tmdb_cache.sqlite")
+    if cache_path:
+        tmdb_api_utils.transport = CachingTransport(tmdb_api_utils.transport, cache_path)
 
-    iteration_actor_ids = ['5064']
-
-    # Get the total movie_credits for Meryl Streep to initialize the node
-    movie_credits = tmdb_api_utils.get_movie_credits_for_person("5064", 8.0)
-    graph.add_node(id = '5064', name = 'Meryl Streep', total_movies = str(len(movie_credits)))
-    for x in range(0, 2):
-        print("Iteration " + str(x))
-        print("Iteration Node Size: " + str(len(iteration_actor_ids)))
-
-        new_actor_ids = []
-        for actor_id in iteration_actor_ids:
-            movie_credits = tmdb_api_utils.get_movie_credits_for_person(actor_id, 8.0)
-            # print(movie_credits)
-            print("Movie Credits")
-            print(len(movie_credits))
+    # Crawl two levels out from Meryl Streep, recording actor -> movie credits, each level's API calls run concurrently
+    crawler = Crawler(tmdb_api_utils, concurrency = concurrency, vote_avg_threshold = 8.0, cast_limit = 3, verbose = True)
+    credits = crawler.run(seed_id = '5064', seed_name = 'Meryl Streep', depth = 2)
 
-            cast_members = [cast for movie_credit in movie_credits for cast in tmdb_api_utils.get_movie_cast(movie_credit['id'], 3, [int(actor_id)])]
-            print("Cast Members")
-            print(len(cast_members))
-            for cast in cast_members:
-                cast_total_movies = str(len(tmdb_api_utils.get_movie_credits_for_person(str(cast['id']), 8.0)))
-                node = (str(cast['id']), cast['name'].replace(',', ''), cast_total_movies)
-                if node not in graph.nodes:
-                    new_actor_ids.append(str(cast['id']))
-                    graph.add_node(str(cast['id']), cast['name'].replace(',', ''), cast_total_movies)
-                graph.add_edge(actor_id, str(cast['id']))
-        iteration_actor_ids = new_actor_ids
+    # An edge links each expanded actor to the co-stars of their movies, as in the steps above, weighted by the
+    # number of movies linking them; credits.project() without star would also link co-stars to each other
+    graph = credits.project(star = True)
     print("Graph Size")
-    print(len(graph.nodes))
+    print(graph.total_nodes())
 
     # call functions or place code here to build graph (graph building code not graded)
 
     graph.write_edges_file()
     graph.write_nodes_file()
-    graph.write_graph_to_json()
+    graph.write_graph_to_json(compact=True, communities=graph.communities(seed=0))
+    tmdb_api_utils.close()
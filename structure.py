@@ -0,0 +1,249 @@
+import random
+from array import array
+
+from csr import CSRGraph
+from traversal import popcount
+
+#############################################################################################################################
+#
+# Use:
+# Structural measures over a frozen `CSRGraph`: k-cores, triangles, clustering coefficients and maximal cliques.
+# Self loops are ignored throughout.
+#
+#############################################################################################################################
+
+
+def core_numbers(csr: CSRGraph) -> array:
+    """
+    Core number of every node by the Batagelj-Zaversnik bucket algorithm in O(V + E): nodes are kept sorted by
+    current degree in a flat array with bucket start positions, the lowest degree node is peeled off and each
+    of its higher-degree neighbours drops one bucket with a constant time swap.
+    :param csr: CSRGraph
+    :return: array('i') of core numbers by node index
+    """
+    return _peel(csr)[0]
+
+
+def degeneracy_order(csr: CSRGraph) -> array:
+    """
+    Return the node indices in the order the k-core peeling removes them: every node has at most
+    degeneracy-many neighbours later in the order
+    """
+    return _peel(csr)[1]
+
+
+def _peel(csr: CSRGraph) -> tuple:
+    """
+    Batagelj-Zaversnik peeling, see core_numbers()
+    :return: (core numbers by node index, nodes in peeling order)
+    """
+    n = csr.num_nodes()
+    offsets, neighbors = csr.offsets, csr.neighbors
+    degree = array('i', [0]) * n
+    for v in range(n):
+        degree[v] = sum(1 for u in neighbors[offsets[v]:offsets[v + 1]] if u != v)
+    max_degree = max(degree) if n else 0
+
+    # bucket sort the nodes by degree: start[d] is where nodes of degree d begin in order
+    start = array('q', [0]) * (max_degree + 1)
+    for d in degree:
+        start[d] += 1
+    position = 0
+    for d in range(max_degree + 1):
+        start[d], position = position, position + start[d]
+    order = array('i', [0]) * n
+    where = array('q', [0]) * n
+    for v in range(n):
+        where[v] = start[degree[v]]
+        order[where[v]] = v
+        start[degree[v]] += 1
+    for d in range(max_degree, 0, -1):
+        start[d] = start[d - 1]
+    start[0] = 0
+
+    for i in range(n):
+        v = order[i]
+        dv = degree[v]
+        for u in neighbors[offsets[v]:offsets[v + 1]]:
+            du = degree[u]
+            if du > dv:
+                # swap u with the first node of its bucket, then shrink the bucket by one
+                first = order[start[du]]
+                if first != u:
+                    pu, pf = where[u], start[du]
+                    order[pu], order[pf] = first, u
+                    where[u], where[first] = pf, pu
+                start[du] += 1
+                degree[u] = du - 1
+    return degree, order
+
+
+def k_core_nodes(csr: CSRGraph, k: int, cores=None) -> list:
+    """
+    Return the node indices of the k-core, the largest subgraph in which every node has degree >= k
+    """
+    cores = core_numbers(csr) if cores is None else cores
+    return [v for v in range(csr.num_nodes()) if cores[v] >= k]
+
+
+def triangles(csr: CSRGraph) -> array:
+    """
+    Exact number of triangles through every node in O(m^1.5).  Edges are oriented from the endpoint with the
+    lower (degree, index) rank to the higher one, which leaves every node with at most O(sqrt(m)) out-neighbours;
+    each triangle is then found exactly once as the intersection of the out-neighbourhoods of one oriented edge.
+    :param csr: CSRGraph
+    :return: array('q') of triangle counts by node index
+    """
+    n = csr.num_nodes()
+    offsets, neighbors = csr.offsets, csr.neighbors
+    degree = [csr.degree(v) for v in range(n)]
+    out = [frozenset(u for u in neighbors[offsets[v]:offsets[v + 1]]
+                     if degree[u] > degree[v] or (degree[u] == degree[v] and u > v))
+           for v in range(n)]
+    counts = array('q', [0]) * n
+    for v in range(n):
+        out_v = out[v]
+        for u in out_v:
+            common = out_v & out[u]
+            if common:
+                counts[v] += len(common)
+                counts[u] += len(common)
+                for w in common:
+                    counts[w] += 1
+    return counts
+
+
+def clustering(csr: CSRGraph, counts=None) -> array:
+    """
+    Local clustering coefficient of every node: the fraction of pairs of its neighbours that are themselves linked
+    :param csr: CSRGraph
+    :param counts: triangle counts from triangles(), computed if not given
+    :return: array('d') by node index
+    """
+    counts = triangles(csr) if counts is None else counts
+    result = array('d', [0.0]) * csr.num_nodes()
+    for v in range(csr.num_nodes()):
+        d = sum(1 for u in csr.neighbors_of(v) if u != v)
+        if d > 1:
+            result[v] = 2.0 * counts[v] / (d * (d - 1))
+    return result
+
+
+def transitivity(csr: CSRGraph, counts=None) -> float:
+    """
+    Global clustering coefficient: 3 * triangles / connected triples
+    """
+    counts = triangles(csr) if counts is None else counts
+    wedges = 0
+    for v in range(csr.num_nodes()):
+        d = sum(1 for u in csr.neighbors_of(v) if u != v)
+        wedges += d * (d - 1) // 2
+    return sum(counts) / wedges if wedges else 0.0
+
+
+def approximate_triangles(edges, p: float = 0.1, seed: int = None) -> dict:
+    """
+    Streaming triangle estimate by edge sampling (DOULION): every edge of the stream is kept with probability p,
+    triangles are counted exactly on the kept edges and scaled by 1 / p^3.  Only the sampled edges and one degree
+    counter per node are held in memory, so the stream can come straight from an edges .csv file.
+    :param edges: iterable of (source, target) or (source, target, weight) tuples, each undirected edge once
+    :param p: sampling probability
+    :param seed: random seed
+    :return: dict with 'triangles' (estimated count), 'transitivity' (estimated global clustering coefficient)
+        and 'sampled_edges'
+    """
+    rng = random.Random(seed)
+    degree = {}
+    sampled = {}
+    for edge in edges:
+        source, target = edge[0], edge[1]
+        if source == target:
+            continue
+        degree[source] = degree.get(source, 0) + 1
+        degree[target] = degree.get(target, 0) + 1
+        if rng.random() < p:
+            sampled.setdefault(source, set()).add(target)
+            sampled.setdefault(target, set()).add(source)
+    found = 0
+    for v, row in sampled.items():
+        for u in row:
+            if u > v:
+                found += len(row & sampled[u])
+    # every triangle is found once per edge of it, i.e. three times
+    estimate = found / 3 / p ** 3
+    wedges = sum(d * (d - 1) // 2 for d in degree.values())
+    return {
+        'triangles': estimate,
+        'transitivity': 3 * estimate / wedges if wedges else 0.0,
+        'sampled_edges': sum(len(row) for row in sampled.values()) // 2,
+    }
+
+
+def maximal_cliques(csr: CSRGraph, min_size: int = 1):
+    """
+    Enumerate maximal cliques with Bron-Kerbosch, using pivoting and a degeneracy ordering (Eppstein, Loeffler and
+    Strash).  The outer loop takes each node v in degeneracy order and searches cliques whose earliest node is v:
+    candidates P are v's later neighbours (at most the degeneracy of the graph) and the excluded set X its earlier
+    neighbours.  Inside that subproblem the neighbourhood of v is renumbered 0..d-1 and P, X and every adjacency
+    row become Python int bitsets, so set operations on the small neighbourhood are single int operations.
+    :param csr: CSRGraph
+    :param min_size: only cliques with at least this many nodes are yielded (and smaller branches are pruned)
+    :return: generator of lists of node indices, one per maximal clique
+    """
+    order = degeneracy_order(csr)
+    rank = array('i', [0]) * csr.num_nodes()
+    for i, v in enumerate(order):
+        rank[v] = i
+    for v in order:
+        local = [u for u in csr.neighbors_of(v) if u != v]
+        if not local:
+            if min_size <= 1:
+                yield [v]
+            continue
+        bit = {u: i for i, u in enumerate(local)}
+        adjacency = []
+        for u in local:
+            mask = 0
+            for w in csr.neighbors_of(u):
+                i = bit.get(w)
+                if i is not None and w != u:
+                    mask |= 1 << i
+            adjacency.append(mask)
+        p = x = 0
+        for i, u in enumerate(local):
+            if rank[u] > rank[v]:
+                p |= 1 << i
+            else:
+                x |= 1 << i
+        for clique in _bron_kerbosch(adjacency, 0, p, x, 1, min_size):
+            yield [v] + [local[i] for i in _bits(clique)]
+
+
+def _bits(mask: int):
+    """
+    Yield the positions of the set bits of mask, lowest first
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _bron_kerbosch(adjacency: list, r: int, p: int, x: int, size: int, min_size: int):
+    """
+    Bron-Kerbosch with Tomita pivoting over bitsets.  r is the current clique (size nodes including the outer v),
+    p the candidates and x the already explored nodes.
+    """
+    if not p:
+        if not x and size >= min_size:
+            yield r
+        return
+    if size + popcount(p) < min_size:
+        return
+    # pivot on the node covering most candidates, only its non-neighbours need branching
+    pivot = max(_bits(p | x), key=lambda u: popcount(p & adjacency[u]))
+    for u in _bits(p & ~adjacency[pivot]):
+        bit = 1 << u
+        yield from _bron_kerbosch(adjacency, r | bit, p & adjacency[u], x & adjacency[u], size + 1, min_size)
+        p &= ~bit
+        x |= bit
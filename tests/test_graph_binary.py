@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph import Graph
+
+#############################################################################################################################
+#
+# Use:
+# Regression tests for the read-only Graph returned by Graph.open_binary() over a save_binary() snapshot.
+#
+#   python3 -m unittest discover tests
+#
+#############################################################################################################################
+
+NODES = [("1", "Meryl Streep", "10"), ("2", "Actor Two", "3"), ("3", "Zoë Ångström", "1"),
+         ("4", "Actor Four", "2"), ("5", "Loner", "1")]
+EDGES = [("1", "2"), ("2", "1"), ("2", "3"), ("3", "1"), ("3", "4")]
+
+
+class GraphBinaryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.graph = Graph()
+        self.graph.add_nodes(NODES)
+        self.graph.add_edges(EDGES)
+        path = os.path.join(self._tmp.name, 'graph.bin')
+        self.graph.save_binary(path)
+        self.mapped = Graph.open_binary(path)
+
+    def tearDown(self):
+        self.mapped = None
+        self._tmp.cleanup()
+
+    def test_nodes_and_edges(self):
+        self.assertIsInstance(self.mapped, Graph)
+        self.assertEqual(self.mapped.nodes, self.graph.nodes)
+        self.assertEqual(self.mapped.total_nodes(), 5)
+        self.assertEqual(self.mapped.total_edges(), 4)
+        self.assertEqual(self.mapped.edge_weight("2", "1"), 2)
+        self.assertFalse(self.mapped.has_edge("1", "4"))
+        self.assertFalse(self.mapped.has_node("6"))
+        self.assertEqual(self.mapped.max_degree_nodes(), self.graph.max_degree_nodes())
+
+    def test_analytics(self):
+        self.assertEqual(self.mapped.shortest_path("1", "4"), ["1", "3", "4"])
+        self.assertIsNone(self.mapped.distance("1", "5"))
+        self.assertEqual(self.mapped.num_components(), 2)
+        self.assertEqual(self.mapped.largest_component_size(), 4)
+        self.assertEqual(self.mapped.pagerank(), self.graph.pagerank())
+        self.assertEqual(self.mapped.communities(seed=0), self.graph.communities(seed=0))
+        self.assertEqual(self.mapped.core_numbers(), self.graph.core_numbers())
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.mapped.add_edge("1", "5")
+        with self.assertRaises(TypeError):
+            self.mapped.add_nodes([("6", "New", "1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph import Graph, _iter_json_records
+
+#############################################################################################################################
+#
+# Use:
+# Regression tests for the streaming graph.json reader behind Graph.from_json().
+#
+#   python3 -m unittest discover tests
+#
+#############################################################################################################################
+
+NODES = [{"id": "1", "name": "Meryl Streep", "movies": "10"},
+         {"id": "2", "name": "Actor \"Two\", [Jr.]", "movies": "3"},
+         {"id": "3", "name": "Zoë Ångström", "movies": "1"}]
+LINKS = [{"source": "1", "target": "2", "weight": 2},
+         {"source": "1", "target": "3", "weight": 1}]
+
+
+def sample_graph() -> Graph:
+    graph = Graph()
+    for node in NODES:
+        graph.add_node(node["id"], node["name"], node["movies"])
+    graph.add_edges([("1", "2"), ("2", "1"), ("3", "1"), ("2", "4")])
+    return graph
+
+
+class GraphJSONTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def assertLoaded(self, graph: Graph) -> None:
+        self.assertEqual(graph.nodes, [(n["id"], n["name"], n["movies"]) for n in NODES])
+        self.assertEqual(list(graph.weighted_edges()), [(l["source"], l["target"], l["weight"]) for l in LINKS])
+
+    def test_links_before_nodes(self):
+        path = self.write('graph.json', json.dumps({"links": LINKS, "nodes": NODES}, indent=4))
+        self.assertLoaded(Graph.from_json(path))
+
+    def test_extra_top_level_keys(self):
+        document = '{"version": 12345, "nodes": %s, "meta": {"nodes": [1, 2]}, "links": %s, "tags": ["a", "]"]}' \
+                   % (json.dumps(NODES), json.dumps(LINKS))
+        self.assertLoaded(Graph.from_json(self.write('graph.json', document)))
+
+    def test_tiny_chunk_sizes(self):
+        document = json.dumps({"count": 1234567, "nodes": NODES, "empty": [], "links": LINKS}, indent=4)
+        expected = list(_iter_json_records(io.StringIO(document)))
+        self.assertEqual(expected, [("nodes", n) for n in NODES] + [("links", l) for l in LINKS])
+        for chunk_size in (1, 2, 3, 5, 7, 16):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(_iter_json_records(io.StringIO(document), chunk_size)), expected)
+                compact = json.dumps(json.loads(document), separators=(',', ':'))
+                self.assertEqual(list(_iter_json_records(io.StringIO(compact), chunk_size)), expected)
+
+    def test_gzip_input(self):
+        path = os.path.join(self.tmp, 'graph.json.gz')
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump({"nodes": NODES, "links": LINKS}, f)
+        self.assertLoaded(Graph.from_json(path))
+
+    def test_round_trip(self):
+        graph = sample_graph()
+        for compact in (False, True):
+            with self.subTest(compact=compact):
+                path = os.path.join(self.tmp, 'graph.json')
+                graph.write_graph_to_json(path, compact=compact, gzip_copy=True)
+                for loaded in (Graph.from_json(path), Graph.from_json(path + '.gz')):
+                    self.assertEqual(loaded.nodes, graph.nodes)
+                    self.assertEqual({frozenset(e[:2]): e[2] for e in loaded.weighted_edges()},
+                                     {frozenset(e[:2]): e[2] for e in graph.weighted_edges()})
+                    again = os.path.join(self.tmp, 'again.json')
+                    loaded.write_graph_to_json(again, compact=compact)
+                    with open(path, encoding='utf-8') as a, open(again, encoding='utf-8') as b:
+                        self.assertEqual(a.read(), b.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
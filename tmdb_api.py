@@ -1,5 +1,8 @@
-import http.client
 import json
+import threading
+from collections import OrderedDict
+
+from transport import HTTPClientTransport, Transport
 
 #############################################################################################################################
 
@@ -9,12 +12,108 @@ import json
 
 ###############################################################################################################################
 
+DOMAIN_NAME = 'api.themoviedb.org'
+
+
+class _LRUMemo:
+    """
+    Bounded, thread safe least recently used map with hit / miss counters
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
 class TMDBAPIUtils:
 
     # Do not modify
     def __init__(self, api_key: str):
         self.api_key = api_key
 
+    # scheme and host requests go to, e.g. set to 'http://localhost:8000' on an instance for a local stand-in server
+    base_url = 'https://' + DOMAIN_NAME
+
+    # decoded responses kept in memory, 0 disables the memo; set on an instance before its first API call.
+    # It only saves requests for callers that ask for the same person or movie twice, like the old sequential loop
+    # in main.py; the Crawler fetches every person and movie once, so it gets no hits there.
+    memo_size = 4096
+
+    @property
+    def memo(self) -> _LRUMemo:
+        """
+        In-memory LRU of decoded, unfiltered API responses, see memo.stats() for its hit / miss counters
+        """
+        if getattr(self, '_memo', None) is None:
+            self._memo = _LRUMemo(self.memo_size)
+        return self._memo
+
+    @property
+    def transport(self) -> Transport:
+        """
+        HTTP backend used for API calls, created on first use: a keep-alive http.client pool unless another
+        Transport (see transport.make_transport()) has been assigned
+        """
+        if getattr(self, '_transport', None) is None:
+            self._transport = HTTPClientTransport()
+        return self._transport
+
+    @transport.setter
+    def transport(self, transport: Transport) -> None:
+        self._transport = transport
+
+    def close(self) -> None:
+        """
+        Close the transport's connections
+        """
+        if getattr(self, '_transport', None) is not None:
+            self._transport.close()
+
+    def _get_json(self, request_uri: str) -> dict:
+        """
+        GET request_uri from the API and decode the JSON body.  The decoded body is memoised before any filtering,
+        so asking for the same person or movie again, with whatever limit / exclude_ids / vote_avg_threshold,
+        is answered from memory.  The returned dict is shared with the memo and must not be modified.
+        """
+        data = self.memo.get(request_uri)
+        if data is None:
+            resp = self.transport.request('GET', self.base_url + request_uri)
+            data = json.loads(resp.body.decode('UTF-8'))
+            if resp.status == 200:
+                self.memo.put(request_uri, data)
+        return data
+
     def get_movie_cast(self, movie_id: str, limit: int = None, exclude_ids: list = None) -> list:
         """
         Get the movie cast for a given movie id, with optional parameters to exclude an cast member
@@ -36,16 +135,10 @@ class TMDBAPIUtils:
         Important: the exclude_ids processing should occur prior to limiting output.
         """
 
-        domain_name = 'api.themoviedb.org'
         request_uri = '/3/movie/' + movie_id + '/credits?api_key=' + self.api_key + '&language=en-US'
-
-        # Use http client to invoke API
-        conn = http.client.HTTPSConnection(domain_name, 443)
-        conn.request('GET', request_uri)
-        resp = conn.getresponse()
-        decoded_resp = resp.read().decode('UTF-8')
-        data = json.loads(decoded_resp)
-        cast_list = data.get('cast')
+        data = self._get_json(request_uri)
+        # collections and unknown ids come back without cast data
+        cast_list = list(data.get('cast') or [])
 
         # limit results
         #if limit:
@@ -75,15 +168,8 @@ class TMDBAPIUtils:
                 'vote_avg': 5.0 # the float value of the vote average value for the credit}, ... ]
         """
 
-        domain_name = 'api.themoviedb.org'
         request_uri = '/3/person/' + person_id + '/movie_credits?api_key=' + self.api_key + '&language=en-US'
-
-        # Use http client to invoke API
-        conn = http.client.HTTPSConnection(domain_name, 443)
-        conn.request('GET', request_uri)
-        resp = conn.getresponse()
-        decoded_resp = resp.read().decode('UTF-8')
-        data = json.loads(decoded_resp)
+        data = self._get_json(request_uri)
 
         # Some movie_credits may actually be collections and do not return cast data.
         # Handle this situation by skipping these instances.
@@ -0,0 +1,403 @@
+import http.client
+import io
+import select
+import ssl
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+#############################################################################################################################
+#
+# Use:
+# HTTP plumbing for `TMDBAPIUtils`.  A `ConnectionPool` keeps a bounded set of keep-alive connections to one host, so
+# consecutive API calls reuse an open socket instead of paying a TCP and TLS handshake each.  When a new connection has
+# to be opened it resumes the last TLS session of the pool (abbreviated handshake), idle connections the server has
+# closed are detected before reuse, and a request that fails on a reused connection is retried once on a fresh one.
+#
+# `TMDBAPIUtils` talks to a `Transport`, so the HTTP library underneath can be swapped:
+#
+# HTTPClientTransport  stdlib http.client, one ConnectionPool per host (the default)
+# Urllib3Transport     urllib3.PoolManager
+# CurlTransport        pycurl, concurrent requests driven by the libcurl multi interface
+#
+# All of them take absolute URLs, return a `Response` and raise ConnectionError when a request cannot be completed.
+# request_many() sends a batch concurrently and returns the responses in request order.  urllib3 and pycurl are
+# imported when their transport is created, so they are only needed if used.
+#
+#############################################################################################################################
+
+# status code, {lower case header name: value}, raw body bytes, and the seconds from the request()/request_many()
+# call to the full body, including any wait for a free connection
+Response = namedtuple('Response', ['status', 'headers', 'body', 'elapsed'], defaults=(0.0,))
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """
+    HTTPSConnection that resumes the TLS session of its pool when connecting
+    """
+
+    def __init__(self, host: str, port: int, timeout: float, context: ssl.SSLContext, pool: "ConnectionPool"):
+        super().__init__(host, port, timeout=timeout, context=context)
+        self._pool = pool
+
+    def connect(self) -> None:
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host, session=self._pool.tls_session)
+        if self.sock.session_reused:
+            self._pool.stats['resumed'] += 1
+
+
+class ConnectionPool:
+
+    def __init__(self, host: str, port: int = 443, maxsize: int = 4, timeout: float = 30.0,
+                 idle_timeout: float = 60.0, context: ssl.SSLContext = None, scheme: str = 'https'):
+        """
+        :param host: host name
+        :param port: port
+        :param maxsize: maximum number of connections to the host, open or in use; further requests wait for one
+        :param timeout: socket timeout, also how long a request waits for a free connection
+        :param idle_timeout: idle connections older than this are closed instead of reused
+        :param context: SSLContext for https, ssl.create_default_context() if not given
+        :param scheme: 'https' or 'http'
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.scheme = scheme
+        self.context = context or (ssl.create_default_context() if scheme == 'https' else None)
+        # last TLS session handed out by the server, resumed by new connections
+        self.tls_session = None
+        self.stats = {'requests': 0, 'connections': 0, 'resumed': 0, 'reconnects': 0}
+        # idle connections, most recently used last
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxsize)
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        self.stats['connections'] += 1
+        if self.scheme == 'https':
+            return _HTTPSConnection(self.host, self.port, self.timeout, self.context, self)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    @staticmethod
+    def _is_stale(conn: http.client.HTTPConnection) -> bool:
+        """
+        Return True if an idle connection can no longer be used: a readable idle socket means the server closed it
+        (or sent something unexpected)
+        """
+        if conn.sock is None:
+            return True
+        try:
+            return bool(select.select([conn.sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def _acquire(self) -> tuple:
+        """
+        Take a connection, waiting for a free slot if maxsize connections are in use
+        :return: (connection, True if it was reused from the idle list)
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("no free connection to " + self.host + " within " + str(self.timeout) + "s")
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                conn, since = self._idle.pop()
+                if now - since < self.idle_timeout and not self._is_stale(conn):
+                    return conn, True
+                conn.close()
+        return self._new_connection(), False
+
+    def _release(self, conn: http.client.HTTPConnection, keep: bool) -> None:
+        if keep:
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        else:
+            conn.close()
+        self._slots.release()
+
+    def _send(self, conn: http.client.HTTPConnection, method: str, url: str, body, headers: dict,
+              start: float) -> tuple:
+        """
+        Send one request and read the whole response
+        :return: (Response, True if the connection can be kept alive)
+        """
+        conn.request(method, url, body, headers)
+        resp = conn.getresponse()
+        data = resp.read()
+        if isinstance(conn.sock, ssl.SSLSocket) and conn.sock.session is not None:
+            self.tls_session = conn.sock.session
+        headers = {name.lower(): value for name, value in resp.getheaders()}
+        return Response(resp.status, headers, data, time.perf_counter() - start), not resp.will_close
+
+    def request(self, method: str, url: str, body=None, headers: dict = None) -> Response:
+        """
+        Send a request over a pooled connection
+        :param method: e.g. 'GET'
+        :param url: request path and query, e.g. '/3/movie/603/credits?language=en-US'
+        :param body: optional request body
+        :param headers: optional request headers
+        :return: Response
+        """
+        start = time.perf_counter()
+        self.stats['requests'] += 1
+        conn, reused = self._acquire()
+        keep = False
+        try:
+            try:
+                response, keep = self._send(conn, method, url, body, headers or {}, start)
+            except (http.client.HTTPException, OSError):
+                if not reused:
+                    raise
+                # the server dropped the keep-alive connection between requests, retry once on a fresh one
+                conn.close()
+                self.stats['reconnects'] += 1
+                conn = self._new_connection()
+                response, keep = self._send(conn, method, url, body, headers or {}, start)
+        finally:
+            self._release(conn, keep)
+        return response
+
+    def close(self) -> None:
+        """
+        Close all idle connections
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
+class Transport:
+    """
+    Request / response contract shared by the HTTP backends
+    """
+
+    def __init__(self, maxsize: int = 4, timeout: float = 30.0, cafile: str = None):
+        """
+        :param maxsize: maximum number of connections per host, also the concurrency of request_many()
+        :param timeout: socket timeout in seconds
+        :param cafile: optional CA bundle to verify the server with, e.g. for a local test server
+        """
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.cafile = cafile
+
+    def request(self, method: str, url: str, headers: dict = None) -> Response:
+        """
+        Send one request to an absolute url and read the whole response
+        """
+        raise NotImplementedError
+
+    def request_many(self, requests: list) -> list:
+        """
+        Send a batch of (method, url, headers) requests concurrently
+        :return: list of Response, in request order
+        """
+        start = time.perf_counter()
+
+        def timed(request: tuple) -> Response:
+            return self.request(*request)._replace(elapsed=time.perf_counter() - start)
+
+        with ThreadPoolExecutor(self.maxsize) as executor:
+            return list(executor.map(timed, requests))
+
+    def close(self) -> None:
+        pass
+
+
+class HTTPClientTransport(Transport):
+    """
+    http.client with a keep-alive ConnectionPool per (scheme, host, port)
+    """
+
+    def __init__(self, maxsize: int = 4, timeout: float = 30.0, cafile: str = None):
+        super().__init__(maxsize, timeout, cafile)
+        self.context = ssl.create_default_context(cafile=cafile)
+        self.pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, scheme: str, host: str, port: int) -> ConnectionPool:
+        key = (scheme, host, port)
+        with self._lock:
+            pool = self.pools.get(key)
+            if pool is None:
+                pool = self.pools[key] = ConnectionPool(host, port, self.maxsize, self.timeout,
+                                                        context=self.context if scheme == 'https' else None,
+                                                        scheme=scheme)
+        return pool
+
+    def request(self, method: str, url: str, headers: dict = None) -> Response:
+        parts = urlsplit(url)
+        pool = self._pool(parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        path = parts.path + ('?' + parts.query if parts.query else '')
+        try:
+            return pool.request(method, path, headers=headers)
+        except (http.client.HTTPException, OSError) as e:
+            raise ConnectionError(method + ' ' + url + ' failed: ' + repr(e)) from e
+
+    def close(self) -> None:
+        for pool in self.pools.values():
+            pool.close()
+
+
+class Urllib3Transport(Transport):
+    """
+    urllib3.PoolManager, which pools connections per host the same way
+    """
+
+    def __init__(self, maxsize: int = 4, timeout: float = 30.0, cafile: str = None):
+        import urllib3
+        super().__init__(maxsize, timeout, cafile)
+        self._errors = urllib3.exceptions.HTTPError
+        self.manager = urllib3.PoolManager(maxsize=maxsize, block=True, timeout=timeout, ca_certs=cafile,
+                                           retries=urllib3.Retry(total=1, redirect=False))
+
+    def request(self, method: str, url: str, headers: dict = None) -> Response:
+        start = time.perf_counter()
+        try:
+            resp = self.manager.request(method, url, headers=headers)
+        except self._errors as e:
+            raise ConnectionError(method + ' ' + url + ' failed: ' + repr(e)) from e
+        headers = {name.lower(): value for name, value in resp.headers.items()}
+        return Response(resp.status, headers, resp.data, time.perf_counter() - start)
+
+    def close(self) -> None:
+        self.manager.clear()
+
+
+class CurlTransport(Transport):
+    """
+    pycurl: transfers are added to one CurlMulti handle, which keeps the connection cache and runs a whole
+    request_many() batch concurrently in this thread.  request() runs its transfer on an easy handle of its own
+    (blocking, without the GIL), so requests from several threads, e.g. the Crawler's pool, proceed in parallel;
+    their number of connections is bounded by the number of calling threads rather than by maxsize.
+    """
+
+    def __init__(self, maxsize: int = 4, timeout: float = 30.0, cafile: str = None):
+        import pycurl
+        super().__init__(maxsize, timeout, cafile)
+        self._pycurl = pycurl
+        self.multi = pycurl.CurlMulti()
+        self.multi.setopt(pycurl.M_MAX_HOST_CONNECTIONS, maxsize)
+        # finished easy handles, reused so their settings, open connections and TLS session cache carry over
+        self._handles = []
+        self._handles_lock = threading.Lock()
+        # request_many() batches share the multi handle, one batch at a time
+        self._lock = threading.Lock()
+
+    def _prepare(self, method: str, url: str, headers: dict) -> tuple:
+        """
+        Set up an easy handle for one request
+        :return: (handle, body buffer, list of received header lines)
+        """
+        pycurl = self._pycurl
+        with self._handles_lock:
+            handle = self._handles.pop() if self._handles else None
+        if handle is None:
+            handle = pycurl.Curl()
+        body = io.BytesIO()
+        header_lines = []
+        handle.setopt(pycurl.URL, url)
+        handle.setopt(pycurl.CUSTOMREQUEST, method)
+        handle.setopt(pycurl.HTTPHEADER, [name + ': ' + str(value) for name, value in (headers or {}).items()])
+        handle.setopt(pycurl.WRITEDATA, body)
+        handle.setopt(pycurl.HEADERFUNCTION, header_lines.append)
+        handle.setopt(pycurl.TIMEOUT_MS, int(self.timeout * 1000))
+        if self.cafile:
+            handle.setopt(pycurl.CAINFO, self.cafile)
+        return handle, body, header_lines
+
+    @staticmethod
+    def _headers(lines: list) -> dict:
+        """
+        Parse the header lines of the last response (after any 1xx interim responses)
+        """
+        headers = {}
+        for line in lines:
+            line = line.decode('iso-8859-1').strip()
+            if line.startswith('HTTP/'):
+                headers = {}
+            elif ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        return headers
+
+    def _release(self, handle) -> None:
+        with self._handles_lock:
+            self._handles.append(handle)
+
+    def request(self, method: str, url: str, headers: dict = None) -> Response:
+        start = time.perf_counter()
+        handle, body, header_lines = self._prepare(method, url, headers)
+        try:
+            handle.perform()
+            # read everything off the handle before releasing it, another thread may take it straight away
+            return Response(handle.getinfo(self._pycurl.RESPONSE_CODE), self._headers(header_lines),
+                            body.getvalue(), time.perf_counter() - start)
+        except self._pycurl.error as e:
+            raise ConnectionError(method + ' ' + url + ' failed: ' + repr(e)) from e
+        finally:
+            self._release(handle)
+
+    def request_many(self, requests: list) -> list:
+        pycurl = self._pycurl
+        results = [None] * len(requests)
+        errors = []
+        with self._lock:
+            start = time.perf_counter()
+            transfers = {}
+            for i, (method, url, headers) in enumerate(requests):
+                handle, body, header_lines = self._prepare(method, url, headers)
+                transfers[handle] = (i, body, header_lines)
+                self.multi.add_handle(handle)
+            while transfers:
+                while self.multi.perform()[0] == pycurl.E_CALL_MULTI_PERFORM:
+                    pass
+                while True:
+                    queued, done, failed = self.multi.info_read()
+                    for handle in done:
+                        i, body, header_lines = transfers.pop(handle)
+                        results[i] = Response(handle.getinfo(pycurl.RESPONSE_CODE), self._headers(header_lines),
+                                              body.getvalue(), time.perf_counter() - start)
+                    for handle, _, message in failed:
+                        i = transfers.pop(handle)[0]
+                        errors.append(requests[i][0] + ' ' + requests[i][1] + ' failed: ' + message)
+                    for handle in done + [f[0] for f in failed]:
+                        self.multi.remove_handle(handle)
+                        self._release(handle)
+                    if not queued:
+                        break
+                if transfers:
+                    # wait for socket activity, or until libcurl's next internal timeout (e.g. while connecting)
+                    timeout = self.multi.timeout()
+                    self.multi.select(timeout / 1000.0 if timeout >= 0 else 1.0)
+        if errors:
+            raise ConnectionError('; '.join(errors))
+        return results
+
+    def close(self) -> None:
+        for handle in self._handles:
+            handle.close()
+        self._handles = []
+        self.multi.close()
+
+
+TRANSPORTS = {
+    'http.client': HTTPClientTransport,
+    'urllib3': Urllib3Transport,
+    'pycurl': CurlTransport,
+}
+
+
+def make_transport(name: str = 'http.client', **options) -> Transport:
+    """
+    Create a transport by name, one of TRANSPORTS
+    :param options: keyword arguments for the transport, maxsize, timeout and cafile
+    """
+    if name not in TRANSPORTS:
+        raise ValueError("unknown transport " + repr(name) + ", expected one of " + ", ".join(TRANSPORTS))
+    return TRANSPORTS[name](**options)
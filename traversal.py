@@ -0,0 +1,206 @@
+from array import array
+
+from csr import CSRGraph
+
+#############################################################################################################################
+#
+# Use:
+# Breadth-first traversals over a frozen `CSRGraph`.  Nodes are dense int indices, `Graph` translates to and from
+# TMDb ids.  Visited sets are dicts rather than arrays of size n, so a query only pays for the part of the graph it
+# actually touches.
+#
+#############################################################################################################################
+
+
+def bidirectional_bfs(csr: CSRGraph, source: int, target: int, all_paths: bool = False) -> tuple:
+    """
+    Shortest path(s) between two node indices, growing a BFS ball from each end and always expanding the
+    side with the smaller frontier.  Each expansion finishes its whole level so the first meeting level gives
+    the exact distance.
+    :param csr: CSRGraph
+    :param source: node index
+    :param target: node index
+    :param all_paths: return every shortest path instead of a single one
+    :return: (distance, [path, ...]) where each path is a list of node indices, or (None, []) if unreachable
+    """
+    if source == target:
+        return 0, [[source]]
+    offsets, neighbors = csr.offsets, csr.neighbors
+    # per side: node -> depth, node -> parents (towards that side's root), current frontier
+    dist = ({source: 0}, {target: 0})
+    parents = ({source: []}, {target: []})
+    frontier = ([source], [target])
+
+    while frontier[0] and frontier[1]:
+        x = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+        dist_x, dist_y, parents_x = dist[x], dist[1 - x], parents[x]
+        depth = dist_x[frontier[x][0]] + 1
+        best = None
+        next_frontier = []
+        for u in frontier[x]:
+            for v in neighbors[offsets[u]:offsets[u + 1]]:
+                if v not in dist_x:
+                    dist_x[v] = depth
+                    parents_x[v] = [u]
+                    next_frontier.append(v)
+                    if v in dist_y and (best is None or depth + dist_y[v] < best):
+                        best = depth + dist_y[v]
+                elif all_paths and dist_x[v] == depth:
+                    parents_x[v].append(u)
+        frontier = (next_frontier, frontier[1]) if x == 0 else (frontier[0], next_frontier)
+        if best is not None:
+            meeting = [v for v in next_frontier if v in dist_y and depth + dist_y[v] == best]
+            if not all_paths:
+                meeting = meeting[:1]
+            paths = []
+            for v in meeting:
+                for head in _paths_to_root(parents[0], v, all_paths):
+                    for tail in _paths_to_root(parents[1], v, all_paths):
+                        paths.append(head[::-1] + tail[1:])
+            return best, paths
+    return None, []
+
+
+def _paths_to_root(parents: dict, v: int, all_paths: bool) -> list:
+    """
+    Return the path(s) from v back to the BFS root following parent links, v first
+    """
+    if not all_paths:
+        path = [v]
+        while parents[v]:
+            v = parents[v][0]
+            path.append(v)
+        return [path]
+    if not parents[v]:
+        return [[v]]
+    return [[v] + rest for p in parents[v] for rest in _paths_to_root(parents, p, True)]
+
+
+# distances are stored as uint8, this value marks "not reachable" (or too far away to store)
+UNREACHABLE = 255
+
+
+def bfs_distances(csr: CSRGraph, source: int):
+    """
+    Single-source BFS hop counts from a node index as an array('B') over all nodes.
+    Nodes that cannot be reached, or sit 255 or more hops away, hold UNREACHABLE.
+    :param csr: CSRGraph
+    :param source: node index
+    :return: array('B') of length csr.num_nodes()
+    """
+    offsets, neighbors = csr.offsets, csr.neighbors
+    dist = array('B', [UNREACHABLE]) * csr.num_nodes()
+    dist[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier and depth + 1 < UNREACHABLE:
+        depth += 1
+        next_frontier = []
+        for u in frontier:
+            for v in neighbors[offsets[u]:offsets[u + 1]]:
+                if dist[v] == UNREACHABLE:
+                    dist[v] = depth
+                    next_frontier.append(v)
+        frontier = next_frontier
+    return dist
+
+
+class LandmarkOracle:
+    """
+    Approximate distance oracle: BFS distances from k landmark nodes are precomputed into uint8 arrays
+    (k bytes per node), after which the triangle inequality bounds the distance between any two nodes:
+
+        max_l |d(l, u) - d(l, v)|  <=  d(u, v)  <=  min_l d(l, u) + d(l, v)
+
+    Each query reads 2k bytes, exact() falls back to a bidirectional BFS only when the bounds disagree.
+    """
+
+    def __init__(self, csr: CSRGraph, landmarks: list):
+        """
+        :param csr: CSRGraph the oracle answers for
+        :param landmarks: list of landmark node indices, high degree nodes give the tightest bounds
+        """
+        self.csr = csr
+        self.landmarks = list(landmarks)
+        self.distances = [bfs_distances(csr, l) for l in self.landmarks]
+
+    def bounds(self, u: int, v: int) -> tuple:
+        """
+        Return (lower, upper) bounds on the distance between node indices u and v in O(k).
+        upper is None when no landmark reaches both nodes.
+        """
+        if u == v:
+            return 0, 0
+        lower, upper = 1, None
+        for dist in self.distances:
+            du, dv = dist[u], dist[v]
+            if du == UNREACHABLE or dv == UNREACHABLE:
+                continue
+            lower = max(lower, abs(du - dv))
+            if upper is None or du + dv < upper:
+                upper = du + dv
+        return lower, upper
+
+    def estimate(self, u: int, v: int):
+        """
+        Return the landmark upper bound as the approximate distance, None if no landmark reaches both nodes
+        """
+        return self.bounds(u, v)[1]
+
+    def exact(self, u: int, v: int):
+        """
+        Return the exact distance, using the bounds when they already agree and a bidirectional BFS otherwise
+        """
+        lower, upper = self.bounds(u, v)
+        if lower == upper:
+            return lower
+        return bidirectional_bfs(self.csr, u, v)[0]
+
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(x: int) -> int:
+        return bin(x).count('1')
+
+
+def multi_source_bfs(csr: CSRGraph, sources: list, width: int = 256):
+    """
+    Bit-parallel BFS from many sources at once.  Sources are processed in batches of width; within a batch
+    source k owns bit k, and every node carries the set of batch sources that have reached it packed into a
+    single Python int.  One pass over the frontier's rows therefore advances all width searches together.
+    :param csr: CSRGraph
+    :param sources: list of source node indices
+    :param width: number of sources per batch (bits per word)
+    :return: generator of (batch, depth, reached) per BFS level, where batch is the list of source indices in
+        the batch and reached is a dict of node index -> bitmask of batch sources at exactly depth hops from it
+    """
+    offsets, neighbors = csr.offsets, csr.neighbors
+    visited = [0] * csr.num_nodes()
+    for start in range(0, len(sources), width):
+        batch = sources[start:start + width]
+        frontier = {}
+        for k, s in enumerate(batch):
+            frontier[s] = frontier.get(s, 0) | (1 << k)
+        for s, bits in frontier.items():
+            visited[s] = bits
+        touched = list(frontier)
+        depth = 0
+        while frontier:
+            depth += 1
+            pushed = {}
+            for u, bits in frontier.items():
+                for v in neighbors[offsets[u]:offsets[u + 1]]:
+                    pushed[v] = pushed.get(v, 0) | bits
+            frontier = {}
+            for v, bits in pushed.items():
+                new = bits & ~visited[v]
+                if new:
+                    if not visited[v]:
+                        touched.append(v)
+                    visited[v] |= new
+                    frontier[v] = new
+            if frontier:
+                yield batch, depth, frontier
+        for v in touched:
+            visited[v] = 0